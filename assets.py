@@ -0,0 +1,149 @@
+# assets.py
+"""
+Static asset build: fingerprinted, precompressed copies of static/.
+
+    python assets.py            # build static/build/ and its manifest
+    python assets.py --clean    # drop earlier builds' files first
+
+Every file under static/ is copied to static/build/ with a hash of its
+content in the name (css/style.css -> css/style.1a2b3c4d5e6f.css), so a
+changed file always gets a new URL and browsers may cache each one
+forever. url() references inside stylesheets are rewritten to the hashed
+names first, so a changed image also changes the stylesheet's hash.
+Text assets get .gz (and, with the optional Brotli package installed,
+.br) variants next to them, compressed once here instead of per request.
+
+static/build/manifest.json maps each original name to its hashed one.
+app.py reads it at startup: url_for("static", filename="css/style.css")
+then points at the hashed copy, which is served with immutable cache
+headers and the best precompressed variant the browser accepts. Without
+a build (or for files added since) the plain /static/ URLs keep working.
+Rerun this after changing anything in static/, then restart the app.
+Files from earlier builds are kept, since pages a running server (or a
+browser) already has may still point at them; --clean removes them.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # optional: only the .br variants need it
+    brotli = None
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BUILD_DIR = "build"
+MANIFEST = "manifest.json"
+# Worth compressing; images like PNG/JPEG are compressed already
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".html", ".xml", ".map", ".ico"}
+HASH_LENGTH = 12
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def load_manifest(static_folder=STATIC_FOLDER):
+    """Return {original name: hashed name} from the last build, or {}."""
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST), encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+
+
+def hashed_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, extension = posixpath.splitext(name)
+    return f"{root}.{digest}{extension}"
+
+
+def rewrite_css_urls(name, css, manifest):
+    """Point url() references at hashed files, relative to the stylesheet's own hashed path."""
+    directory = posixpath.dirname(name)
+
+    def replace(match):
+        quote, reference = match.groups()
+        path, suffix = re.match(r"([^?#]*)(.*)", reference).groups()
+        if re.match(r"^[a-z][a-z0-9+.-]*:|^//", path, re.I) or not path:
+            return match.group(0)  # data:, http:, protocol-relative
+        if path.startswith("/static/"):
+            target = path[len("/static/"):]
+        elif path.startswith("/"):
+            return match.group(0)
+        else:
+            target = posixpath.normpath(posixpath.join(directory, path))
+        if target not in manifest:
+            return match.group(0)
+        # The stylesheet's hashed copy sits in the same directory as the original
+        relative = posixpath.relpath(manifest[target], directory or ".")
+        return f"url({quote}{relative}{suffix}{quote})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def write_variants(path, content):
+    """Write path plus any compressed variants that come out smaller."""
+    with open(path, "wb") as output:
+        output.write(content)
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE:
+        return []
+    written = []
+    # mtime=0 keeps the .gz byte-identical between builds of the same file
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    for extension, compressed in variants:
+        if len(compressed) < len(content):
+            with open(path + extension, "wb") as output:
+                output.write(compressed)
+            written.append(extension)
+    return written
+
+
+def build(static_folder=STATIC_FOLDER, clean=False):
+    """Write hashed copies of everything in static/ to static/build/. Returns the manifest."""
+    build_folder = os.path.join(static_folder, BUILD_DIR)
+    if clean:
+        shutil.rmtree(build_folder, ignore_errors=True)
+
+    sources = []
+    for root, directories, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            directories[:] = [d for d in directories if d != BUILD_DIR]
+        for filename in files:
+            path = os.path.join(root, filename)
+            sources.append(os.path.relpath(path, static_folder).replace(os.sep, "/"))
+
+    # Stylesheets last, so the files they reference already have hashed names
+    sources.sort(key=lambda name: (name.endswith(".css"), name))
+
+    manifest = {}
+    for name in sources:
+        with open(os.path.join(static_folder, name), "rb") as source:
+            content = source.read()
+        if name.endswith(".css"):
+            content = rewrite_css_urls(name, content.decode("utf-8"), manifest).encode("utf-8")
+        manifest[name] = hashed_name(name, content)
+
+        target = os.path.join(build_folder, manifest[name])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        variants = write_variants(target, content)
+        print(f"{name} -> {BUILD_DIR}/{manifest[name]}" + (f" (+{', '.join(variants)})" if variants else ""))
+
+    with open(os.path.join(build_folder, MANIFEST), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets.")
+    parser.add_argument("--clean", action="store_true", help="remove files from earlier builds first")
+    args = parser.parse_args()
+
+    manifest = build(clean=args.clean)
+    note = "" if brotli is not None else " (install Brotli for .br variants)"
+    print(f"Built {len(manifest)} assets into static/{BUILD_DIR}/{note}.")
@@ -0,0 +1,405 @@
+# benchmark.py
+"""
+Repeatable load benchmark for the main pages and API routes.
+
+Drives a fixed mix of routes as one of the seed_load.py users and
+reports p50/p95/p99 latency and SQL statements per request for each.
+Runs in-process through the Flask test client by default, or against a
+running server with --url (e.g. a local gunicorn):
+
+    python seed_load.py --users 20 --items 500
+    python benchmark.py --requests 200 --label baseline
+    python benchmark.py --url http://127.0.0.1:8000 --compare
+
+Each run is appended to bench_results.jsonl with the git commit, so
+--compare can show the change against the previous run of the same
+label and mode. Against --url, statement counts come from the server's
+/metrics and are only exact with a single worker; set STACHE_METRICS_TOKEN
+to the server's token (or allow this machine's address) to read them.
+
+--flood N adds N threads posting wrong passwords to /login for the whole
+measured run, at --flood-rate attempts per second between them, to show
+how a login flood affects everyone else's pages (compare with a run
+where STACHE_AUTH_RATE_LIMIT=0):
+
+    python benchmark.py --flood 4 --flood-rate 50 --label flood --compare
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+DEFAULT_RESULTS_FILE = "bench_results.jsonl"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+# ----- Clients -----
+class TestClient:
+    """In-process: Flask test client, statements counted by engine events."""
+
+    mode = "test-client"
+
+    def __init__(self, username):
+        from sqlalchemy import event
+
+        from app import app
+        from models import db, User
+
+        app.config["TESTING"] = True
+        self.app = app
+        self.client = app.test_client()
+        self.statements = 0
+        # Only count this thread's statements, not a login flood's
+        self._thread = threading.get_ident()
+
+        with app.app_context():
+            user = User.query.filter_by(username=username).first()
+            if user is None:
+                raise SystemExit(f"No user named {username!r}; run seed_load.py first.")
+            with self.client.session_transaction() as session:
+                session["user_id"] = user.id
+                session["username"] = user.username
+                session["sid"] = "benchmark"
+            event.listen(db.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        if threading.get_ident() == self._thread:
+            self.statements += 1
+
+    def get(self, path):
+        """Return (status, body bytes, seconds, statements)."""
+        self.statements = 0
+        started = time.perf_counter()
+        response = self.client.get(path)
+        body = response.get_data()
+        return response.status_code, body, time.perf_counter() - started, self.statements
+
+    def poster(self):
+        """Return post(path, form) -> status, on a client of its own (for another thread)."""
+        client = self.app.test_client()
+        return lambda path, form: client.post(path, data=form).status_code
+
+
+class HTTPClient:
+    """Against a running server; statements are read back from /metrics."""
+
+    mode = "http"
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        form = urllib.parse.urlencode({"username": username, "password": password}).encode()
+        self.opener.open(self.base_url + "/login", data=form)
+        status, body, _ = self._fetch("/api/staches")
+        if status != 200:
+            raise SystemExit(f"Could not log in as {username!r} at {self.base_url}.")
+
+    def _fetch(self, path, headers=None):
+        started = time.perf_counter()
+        try:
+            request = urllib.request.Request(self.base_url + path, headers=headers or {})
+            with self.opener.open(request) as response:
+                body = response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            body = error.read()
+            status = error.code
+        return status, body, time.perf_counter() - started
+
+    def statement_totals(self):
+        """Per-endpoint (statement sum, request count) from /metrics, or {}."""
+        token = os.environ.get("STACHE_METRICS_TOKEN")
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        status, body, _ = self._fetch("/metrics", headers)
+        if status != 200:
+            return {}
+        totals = {}
+        pattern = re.compile(r'^stache_db_statements_per_request_(sum|count)\{endpoint="([^"]+)"\} (\S+)$')
+        for line in body.decode().splitlines():
+            match = pattern.match(line)
+            if match:
+                kind, endpoint, value = match.groups()
+                totals.setdefault(endpoint, [0.0, 0.0])[kind == "count"] = float(value)
+        return totals
+
+    def get(self, path):
+        status, body, seconds = self._fetch(path)
+        return status, body, seconds, None
+
+    def poster(self):
+        def post(path, form):
+            request = urllib.request.Request(self.base_url + path, data=urllib.parse.urlencode(form).encode())
+            try:
+                # Not following the redirect keeps a success from costing a page load
+                with urllib.request.urlopen(request) as response:
+                    return response.status
+            except urllib.error.HTTPError as error:
+                return error.code
+        return post
+
+
+# ----- Scenario -----
+def build_routes(client, rng):
+    """Pick the route mix, using the benchmark user's own ids from the API."""
+    def api(path):
+        status, body, _, _ = client.get(path)
+        if status != 200:
+            raise SystemExit(f"GET {path} returned {status}.")
+        return json.loads(body)
+
+    staches = api("/api/staches")["staches"]
+    items = api("/api/items?limit=200")["items"]
+    projects = api("/api/projects")["projects"]
+    if not staches or not items:
+        raise SystemExit("The benchmark user has no staches or items; run seed_load.py first.")
+
+    item_words = [item["name"].split()[0] for item in items]
+    item_tags = [tag for item in items for tag in item["tags"]] or ["none"]
+
+    routes = {
+        "home": lambda: "/",
+        "staches": lambda: "/staches",
+        "stache_detail": lambda: f"/staches/{rng.choice(staches)['slug']}",
+        "items": lambda: "/items",
+        "item_detail": lambda: f"/items/{rng.choice(items)['id']}",
+        "search": lambda: "/search?" + urllib.parse.urlencode({"q": rng.choice(item_words)}),
+        "tags": lambda: "/tags?" + urllib.parse.urlencode({"tag": rng.choice(item_tags)}),
+        "account_profile": lambda: "/account/profile",
+        "api_items": lambda: "/api/items?limit=100",
+    }
+    if projects:
+        routes["projects"] = lambda: "/projects"
+        routes["project_detail"] = lambda: f"/projects/{rng.choice(projects)['id']}"
+    return routes
+
+
+class LoginFlood:
+    """Threads posting wrong passwords to /login until stopped, tallying the replies."""
+
+    def __init__(self, client, threads, username, seed, rate=0):
+        self.client = client
+        self.threads = threads
+        # Attempts per second across all threads; 0 for as fast as they can
+        self.rate = rate
+        self.username = username
+        self.seed = seed
+        self.statuses = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def _attack(self, number):
+        post = self.client.poster()
+        rng = random.Random(self.seed + number)
+        interval = self.threads / self.rate if self.rate else 0.0
+        due = time.perf_counter()
+        while not self._stop.is_set():
+            # Keep to the offered rate even when replies are slow or fast
+            due += interval
+            if due > time.perf_counter() and self._stop.wait(due - time.perf_counter()):
+                break
+            # Half at the benchmark user, half at usernames that don't exist
+            username = self.username if rng.random() < 0.5 else f"nobody{rng.randrange(10 ** 6)}"
+            status = post("/login", {"username": username, "password": "wrong-password"})
+            with self._lock:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        for number in range(self.threads):
+            worker = threading.Thread(target=self._attack, args=(number,), daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self):
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+        self.seconds = time.perf_counter() - self.started
+
+    def summary(self):
+        attempts = sum(self.statuses.values())
+        return {
+            "threads": self.threads,
+            "offered_rate": self.rate or None,
+            "attempts": attempts,
+            "attempts_per_second": round(attempts / self.seconds, 1) if self.seconds else None,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+        }
+
+
+def run(client, requests_per_route, warmup, seed, flood=None):
+    rng = random.Random(seed)
+    routes = build_routes(client, rng)
+
+    for make_path in routes.values():
+        for _ in range(warmup):
+            client.get(make_path())
+
+    if flood:
+        flood.start()
+
+    before = client.statement_totals() if isinstance(client, HTTPClient) else {}
+    samples = {name: [] for name in routes}
+    statements = {name: [] for name in routes}
+    errors = {name: 0 for name in routes}
+
+    # Interleave the routes so no route only ever sees a warm cache
+    for _ in range(requests_per_route):
+        for name, make_path in routes.items():
+            status, _, seconds, count = client.get(make_path())
+            if status >= 400:
+                errors[name] += 1
+            samples[name].append(seconds)
+            if count is not None:
+                statements[name].append(count)
+
+    if flood:
+        flood.stop()
+    after = client.statement_totals() if isinstance(client, HTTPClient) else {}
+
+    results = {}
+    for name in routes:
+        times = sorted(samples[name])
+        if statements[name]:
+            per_request = statistics.mean(statements[name])
+        elif name in after:
+            # Route names match the Flask endpoint names
+            total = after[name][0] - before.get(name, [0.0, 0.0])[0]
+            count = after[name][1] - before.get(name, [0.0, 0.0])[1]
+            per_request = total / count if count else None
+        else:
+            per_request = None
+        results[name] = {
+            "requests": len(times),
+            "errors": errors[name],
+            "p50_ms": round(percentile(times, 50) * 1000, 2),
+            "p95_ms": round(percentile(times, 95) * 1000, 2),
+            "p99_ms": round(percentile(times, 99) * 1000, 2),
+            "mean_ms": round(statistics.mean(times) * 1000, 2),
+            "queries_per_request": round(per_request, 2) if per_request is not None else None,
+        }
+    return results
+
+
+# ----- Reporting -----
+def print_report(results, previous=None):
+    header = f"{'route':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/req':>7} {'errors':>6}"
+    print(header)
+    print("-" * len(header))
+    for name, row in results.items():
+        queries = row["queries_per_request"]
+        line = (
+            f"{name:<16} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} "
+            f"{queries if queries is not None else '-':>7} {row['errors']:>6}"
+        )
+        old = (previous or {}).get(name)
+        if old:
+            change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+            line += f"   p95 {change:+.0f}% vs {old['p95_ms']:.2f}"
+            if queries is not None and old.get("queries_per_request") is not None:
+                line += f", q/req {old['queries_per_request']} -> {queries}"
+        print(line)
+
+
+def load_previous(path, label, mode):
+    """Return the latest stored run with the same label and mode, or None."""
+    latest = None
+    try:
+        with open(path, encoding="utf-8") as results_file:
+            for line in results_file:
+                record = json.loads(line)
+                if record.get("label") == label and record.get("mode") == mode:
+                    latest = record
+    except FileNotFoundError:
+        pass
+    return latest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the main Stache routes.")
+    parser.add_argument("--url", help="benchmark a running server instead of the test client")
+    parser.add_argument("--user", default="load0001", help="user to log in as (see seed_load.py)")
+    parser.add_argument("--password", default="load-password")
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per route")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per route first")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="default", help="name runs to compare like with like")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="JSON lines file to append to")
+    parser.add_argument("--compare", action="store_true", help="show the change since the last matching run")
+    parser.add_argument("--no-save", action="store_true", help="don't append this run to the results file")
+    parser.add_argument("--flood", type=int, default=0, metavar="N",
+                        help="N threads posting wrong passwords to /login during the run")
+    parser.add_argument("--flood-rate", type=float, default=50,
+                        help="login attempts per second across the flood threads (0: unthrottled)")
+    args = parser.parse_args()
+
+    if args.url:
+        client = HTTPClient(args.url, args.user, args.password)
+    else:
+        client = TestClient(args.user)
+
+    previous = load_previous(args.results, args.label, client.mode) if args.compare else None
+    flood = LoginFlood(client, args.flood, args.user, args.seed, args.flood_rate) if args.flood else None
+    started = time.perf_counter()
+    results = run(client, args.requests, args.warmup, args.seed, flood)
+    elapsed = time.perf_counter() - started
+
+    print_report(results, previous["routes"] if previous else None)
+    if previous:
+        print(f"\nCompared with {previous['commit'] or 'unknown commit'} at {previous['started_at']}.")
+    print(f"\n{sum(r['requests'] for r in results.values())} requests in {elapsed:.1f}s.")
+    if flood:
+        summary = flood.summary()
+        statuses = ", ".join(f"{count} x {status}" for status, count in summary["statuses"].items())
+        print(f"Login flood: {summary['attempts']} attempts from {summary['threads']} threads "
+              f"({summary['attempts_per_second']}/s): {statuses}.")
+
+    if not args.no_save:
+        record = {
+            "label": args.label,
+            "mode": client.mode,
+            "url": args.url,
+            "commit": git_revision(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "user": args.user,
+            "requests_per_route": args.requests,
+            "flood": flood.summary() if flood else None,
+            "routes": results,
+        }
+        with open(args.results, "a", encoding="utf-8") as results_file:
+            results_file.write(json.dumps(record) + "\n")
@@ -0,0 +1,116 @@
+# compression.py
+"""
+gzip / brotli compression of dynamic responses (HTML pages, JSON, exports).
+
+app.py runs compress_response on every response after the other
+after_request hooks. A response is compressed when the browser's
+Accept-Encoding allows it, its type is text-like (see COMPRESSIBLE_TYPES)
+and nothing has encoded it already (static_build sends precompressed
+files itself). Brotli is preferred when the optional Brotli package is
+installed and the browser accepts both; otherwise gzip.
+
+Buffered responses smaller than min_size go out as they are: below about
+one network packet compression saves nothing but CPU. Streamed responses
+(exports, import progress) have no size up front, so they are compressed
+chunk by chunk and flushed after each one; a progress line still reaches
+the browser as soon as it is yielded, and nothing is buffered.
+
+Compressed responses get a weak ETag, since their bytes differ from the
+uncompressed ones. If-None-Match uses weak comparison, so conditional
+requests still get their 304s.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/plain", "text/csv", "text/css", "text/xml", "text/javascript",
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml",
+}
+# Quality 4-5 is the usual on-the-fly setting; 11 (what assets.py uses) is
+# far too slow per request
+BROTLI_QUALITY = 4
+# zlib wbits for a gzip header and trailer around the deflate stream
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def choose_encoding(accept_encodings):
+    """Return "br", "gzip" or None for a request's Accept-Encoding (werkzeug Accept)."""
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return accept_encodings.best_match(offered)
+
+
+def compress(data, encoding, level=6):
+    """Compress a whole body at once."""
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    # mtime=0: the same page compresses to the same bytes
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding, level=6):
+    """Compress an iterable of chunks, flushing after each so none is held back."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        process, finish = compressor.compress, compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Let the wrapped generator clean up (stream_with_context pops its
+        # request context on close), also when the client disconnects early
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, accept_encodings, min_size=1024, level=6):
+    """Compress a werkzeug response in place when worthwhile. Returns the response."""
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough  # send_file(): serve files as they are
+        or "Content-Encoding" in response.headers
+        or response.cache_control.no_transform
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+    if not response.is_streamed and response.calculate_content_length() < min_size:
+        return response
+
+    # From here the body depends on Accept-Encoding, even when sent as is
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        response.set_data(compress(response.get_data(), encoding, level))
+    response.content_encoding = encoding
+
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,367 @@
+# delivery.py
+"""
+Outbox delivery worker: sends queued email so web requests never wait on SMTP.
+
+Run it as its own long-lived process, like scheduler.py:
+
+    python delivery.py              # run until stopped (Ctrl+C / SIGTERM)
+    python delivery.py --once       # send whatever is due now and exit
+
+Each pass claims a batch of due outbox rows, and with them every other
+due row for the same users, by pushing their next_attempt_at out by a
+lease and committing. Nothing is held open while sending, and a worker
+that dies mid-batch only delays its rows until the lease runs out. On
+Postgres the claim uses FOR UPDATE SKIP LOCKED, so several workers can
+share the queue; on SQLite run just one. Its write transactions start
+with BEGIN IMMEDIATE there (models.begin_write), like the web workers'
+POSTs, and a pass that still fails on the database is rolled back and
+retried; rows it had claimed wait out their lease.
+
+Claimed rows are coalesced: everything due for one recipient goes out as
+a single message. Messages are sent from a small thread pool over a pool
+of SMTP connections that stay open between messages and between passes.
+A temporary failure (connection trouble, 4xx replies) is retried with
+exponential backoff and jitter; a permanent one (5xx, refused recipient)
+or running out of attempts marks the rows failed.
+
+SMTP settings come from the environment:
+
+    STACHE_SMTP_HOST / STACHE_SMTP_PORT      default localhost:1025
+    STACHE_SMTP_USERNAME / STACHE_SMTP_PASSWORD
+    STACHE_SMTP_STARTTLS=1                   upgrade the connection with STARTTLS
+    STACHE_MAIL_FROM                         default stache@localhost
+
+For local testing, point it at a debugging server that prints each
+message instead of delivering it, e.g. `python -m aiosmtpd -n -l localhost:1025`.
+"""
+import argparse
+import os
+import queue
+import random
+import signal
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import OperationalError
+
+from models import db, begin_write, OutboxMessage, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_FAILED
+
+BATCH_SIZE = 200
+POOL_SIZE = 4
+# How long a claim keeps other workers off a row
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 3600
+POLL_SECONDS = 5
+# Sent rows are kept this long, then pruned
+KEEP_SENT_DAYS = 7
+# Longest list of reminders in one coalesced message
+MAX_LINES_PER_MESSAGE = 100
+
+
+class PermanentFailure(Exception):
+    """The server rejected the message; retrying won't help."""
+
+
+# ----- SMTP -----
+class SMTPPool:
+    """
+    Up to `size` open SMTP connections, shared by the sending threads.
+
+    A connection goes back to the pool after each message. One that has
+    sat idle longer than max_idle is checked with NOOP before reuse, since
+    servers drop quiet clients; a dead one is replaced transparently.
+    """
+
+    def __init__(self, host, port, size=POOL_SIZE, username=None, password=None,
+                 starttls=False, timeout=30, max_idle=60):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.connects = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        with self._lock:
+            self.connects += 1
+        return smtp
+
+    def _checkout(self):
+        while True:
+            try:
+                smtp, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - idle_since < self.max_idle:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._discard(smtp)
+
+    @staticmethod
+    def _discard(smtp):
+        try:
+            smtp.close()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            smtp = self._checkout()
+            try:
+                yield smtp
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as error:
+                # The server answered, so the connection is still usable
+                # unless it said it is closing (421)
+                if getattr(error, "smtp_code", None) == 421:
+                    self._discard(smtp)
+                else:
+                    self._idle.put((smtp, time.monotonic()))
+                raise
+            except BaseException:
+                self._discard(smtp)
+                raise
+            self._idle.put((smtp, time.monotonic()))
+
+    def send(self, message):
+        """Send one message, reconnecting once if a pooled connection went away."""
+        for attempt in range(2):
+            try:
+                with self.connection() as smtp:
+                    smtp.send_message(message)
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt:
+                    raise
+            except smtplib.SMTPRecipientsRefused as error:
+                raise PermanentFailure(str(error)) from error
+            except smtplib.SMTPResponseException as error:
+                if 500 <= error.smtp_code < 600:
+                    raise PermanentFailure(f"{error.smtp_code} {error.smtp_error!r}") from error
+                raise
+
+    def close(self):
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._discard(smtp)
+
+
+def pool_from_environment(size=POOL_SIZE):
+    return SMTPPool(
+        os.environ.get("STACHE_SMTP_HOST", "localhost"),
+        int(os.environ.get("STACHE_SMTP_PORT", "1025")),
+        size=size,
+        username=os.environ.get("STACHE_SMTP_USERNAME") or None,
+        password=os.environ.get("STACHE_SMTP_PASSWORD"),
+        starttls=os.environ.get("STACHE_SMTP_STARTTLS", "0") == "1",
+    )
+
+
+# ----- Queue -----
+def backoff(attempts):
+    """Seconds to wait before attempt number attempts + 1: exponential, with jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return random.uniform(delay / 2, delay)
+
+
+def claim(now, batch_size=BATCH_SIZE, lease=LEASE_SECONDS):
+    """
+    Lease due rows and return them.
+
+    Up to batch_size due rows, oldest first, plus every other row due for
+    the same users so that each user's reminders go out together.
+    """
+    begin_write()
+    due = (OutboxMessage.status == OUTBOX_PENDING, OutboxMessage.next_attempt_at <= now)
+    users = (
+        select(OutboxMessage.user_id)
+        .where(*due)
+        .order_by(OutboxMessage.next_attempt_at)
+        .limit(batch_size)
+    )
+    rows = db.session.execute(
+        select(
+            OutboxMessage.id, OutboxMessage.user_id, OutboxMessage.recipient,
+            OutboxMessage.subject, OutboxMessage.body, OutboxMessage.attempts,
+        )
+        .where(*due, OutboxMessage.user_id.in_(users))
+        .order_by(OutboxMessage.created_at, OutboxMessage.id)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if rows:
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_([row.id for row in rows]))
+            .values(
+                next_attempt_at=now + timedelta(seconds=lease),
+                attempts=OutboxMessage.attempts + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.session.commit()
+    return rows
+
+
+def coalesce(rows, sender):
+    """Group claimed rows by recipient into (row ids, EmailMessage) pairs."""
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.user_id, row.recipient), []).append(row)
+
+    messages = []
+    for (_, recipient), group in groups.items():
+        message = EmailMessage()
+        message["From"] = sender
+        message["To"] = recipient
+        if len(group) == 1:
+            message["Subject"] = group[0].subject
+            message.set_content(group[0].body + "\n")
+        else:
+            message["Subject"] = f"{len(group)} Stache reminders"
+            lines = [row.body for row in group[:MAX_LINES_PER_MESSAGE]]
+            if len(group) > MAX_LINES_PER_MESSAGE:
+                lines.append(f"...and {len(group) - MAX_LINES_PER_MESSAGE} more.")
+            message.set_content("\n".join(lines) + "\n")
+        messages.append(([row.id for row in group], max(row.attempts for row in group) + 1, message))
+    return messages
+
+
+def record_results(results, now, max_attempts=MAX_ATTEMPTS):
+    """Write back each message's outcome: sent, retry later, or failed."""
+    updates = []
+    for ids, attempts, error, permanent in results:
+        if error is None:
+            values = {"status": OUTBOX_SENT, "sent_at": now, "last_error": None}
+        elif permanent or attempts >= max_attempts:
+            values = {"status": OUTBOX_FAILED, "last_error": error[:500]}
+        else:
+            values = {
+                "next_attempt_at": now + timedelta(seconds=backoff(attempts)),
+                "last_error": error[:500],
+            }
+        updates.extend(dict(values, id=row_id) for row_id in ids)
+    begin_write()
+    if updates:
+        # ORM bulk UPDATE by primary key: one executemany per set of columns
+        db.session.execute(update(OutboxMessage), updates)
+    db.session.commit()
+
+
+def deliver(pool, executor, sender, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Claim, send and record one batch. Returns (rows claimed, messages sent)."""
+    rows = claim(datetime.utcnow(), batch_size)
+    if not rows:
+        return 0, 0
+
+    def send(entry):
+        ids, attempts, message = entry
+        try:
+            pool.send(message)
+        except PermanentFailure as error:
+            return ids, attempts, str(error), True
+        except (smtplib.SMTPException, OSError) as error:
+            return ids, attempts, f"{type(error).__name__}: {error}", False
+        return ids, attempts, None, False
+
+    results = list(executor.map(send, coalesce(rows, sender)))
+    record_results(results, datetime.utcnow(), max_attempts)
+    return len(rows), sum(1 for result in results if result[2] is None)
+
+
+def prune(now, keep_days=KEEP_SENT_DAYS):
+    """Delete sent rows older than keep_days. Failed rows stay for inspection."""
+    begin_write()
+    db.session.execute(
+        delete(OutboxMessage)
+        .where(OutboxMessage.status == OUTBOX_SENT, OutboxMessage.sent_at < now - timedelta(days=keep_days))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def run(stop, pool, sender, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS, poll=POLL_SECONDS):
+    """Deliver until the stop event is set, sleeping poll seconds when idle."""
+    pruned_at = float("-inf")
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        while not stop.is_set():
+            try:
+                claimed, sent = deliver(pool, executor, sender, batch_size, max_attempts)
+                if claimed:
+                    print(f"{datetime.utcnow().isoformat(timespec='seconds')} sent {sent} messages "
+                          f"for {claimed} outbox rows", flush=True)
+                    continue
+
+                if time.monotonic() - pruned_at >= 3600:
+                    prune(datetime.utcnow())
+                    pruned_at = time.monotonic()
+            except OperationalError as error:
+                # A failed claim changed nothing; after a failed record_results
+                # the sent rows go out again once their lease runs out
+                db.session.rollback()
+                print(f"{datetime.utcnow().isoformat(timespec='seconds')} database error, "
+                      f"retrying: {error.orig}", flush=True)
+            stop.wait(poll)
+
+
+if __name__ == "__main__":
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Send queued outbox email.")
+    parser.add_argument("--once", action="store_true", help="send what is due now, then exit")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="SMTP connections and sending threads")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="seconds between checks when idle")
+    args = parser.parse_args()
+
+    sender = os.environ.get("STACHE_MAIL_FROM", "stache@localhost")
+    pool = pool_from_environment(args.pool_size)
+
+    with app.app_context():
+        try:
+            if args.once:
+                sent = 0
+                with ThreadPoolExecutor(max_workers=pool.size) as executor:
+                    while True:
+                        claimed, batch_sent = deliver(pool, executor, sender, args.batch_size, args.max_attempts)
+                        sent += batch_sent
+                        if not claimed:
+                            break
+                print(f"Sent {sent} messages over {pool.connects} SMTP connections.")
+            else:
+                stop = threading.Event()
+                signal.signal(signal.SIGTERM, lambda *_: stop.set())
+                signal.signal(signal.SIGINT, lambda *_: stop.set())
+                print("Delivery worker running.", flush=True)
+                run(stop, pool, sender, args.batch_size, args.max_attempts, args.poll)
+        finally:
+            pool.close()
@@ -0,0 +1,146 @@
+# exporter.py
+"""
+Streaming export of a user's staches, items, projects and tasks.
+
+Every export is a generator: rows come off a server-side cursor
+(yield_per) in batches and are encoded as they arrive, so the first
+bytes go out immediately and the full result set is never held in
+memory. Used by the /export routes in app.py.
+"""
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from models import db, Stache, Item, Project, ProjectTask
+
+# Rows fetched from the cursor per round trip
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_KINDS = ("staches", "items", "projects", "tasks")
+
+
+def export_query(user_id, kind):
+    """Return the Core SELECT for one kind of record, scoped to user_id."""
+    if kind == "staches":
+        return (
+            select(
+                Stache.id, Stache.name, Stache.slug, Stache.description,
+                Stache.locations, Stache.tags_csv.label("tags"),
+                Stache.created_at, Stache.updated_at,
+            )
+            .where(Stache.user_id == user_id)
+            .order_by(Stache.id)
+        )
+    if kind == "items":
+        # Column names line up with importer.py so an export can be re-imported
+        return (
+            select(
+                Item.id, Item.stache_id, Stache.name.label("stache"), Item.name,
+                Item.category, Item.location, Item.condition,
+                Item.tags_csv.label("tags"), Item.notes,
+            )
+            .join(Stache, Item.stache_id == Stache.id)
+            .where(Stache.user_id == user_id)
+            .order_by(Item.id)
+        )
+    if kind == "projects":
+        return (
+            select(
+                Project.id, Project.stache_id, Project.name, Project.description,
+                Project.status, Project.created_at, Project.updated_at,
+            )
+            .where(Project.user_id == user_id)
+            .order_by(Project.id)
+        )
+    if kind == "tasks":
+        return (
+            select(
+                ProjectTask.id, ProjectTask.project_id, ProjectTask.item_id,
+                ProjectTask.description, ProjectTask.completed, ProjectTask.created_at,
+            )
+            .join(Project, ProjectTask.project_id == Project.id)
+            .where(Project.user_id == user_id)
+            .order_by(ProjectTask.id)
+        )
+    raise ValueError(f"Unknown export kind {kind!r}.")
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(user_id, kind):
+    """Yield (column names, row batches) for one kind of record."""
+    result = db.session.execute(
+        export_query(user_id, kind).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    yield list(result.keys())
+    for batch in result.partitions():
+        yield batch
+
+
+def export_csv(user_id, kind):
+    """Yield CSV text for one kind of record, one chunk per cursor batch."""
+    rows = iter_rows(user_id, kind)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(next(rows))
+    for batch in rows:
+        writer.writerows([_plain(v) for v in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(user_id, kind):
+    """Yield one JSON object per line for one kind of record."""
+    rows = iter_rows(user_id, kind)
+    columns = next(rows)
+    for batch in rows:
+        yield "".join(
+            json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+
+class _StreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that zipfile writes into and we drain."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(user_id):
+    """Yield a zip archive holding one CSV per kind of record."""
+    sink = _StreamBuffer()
+    # On an unseekable sink zipfile writes data descriptors after each
+    # entry instead of seeking back, so the archive can be streamed
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for kind in EXPORT_KINDS:
+            with archive.open(f"{kind}.csv", mode="w", force_zip64=True) as entry:
+                for text in export_csv(user_id, kind):
+                    entry.write(text.encode("utf-8"))
+                    data = sink.drain()
+                    if data:
+                        yield data
+    yield sink.drain()
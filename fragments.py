@@ -0,0 +1,85 @@
+# fragments.py
+"""
+In-process LRU cache of rendered HTML fragments (the stache and item cards).
+
+Entries are keyed by (template, object id) and remember the version they
+were rendered at: the row's updated_at plus anything else the card shows.
+A lookup only hits when the caller's version still matches, so a stale
+card is never served, whether the row was changed by a bulk statement
+that skips the ORM or by another worker process. Mapper events drop a
+row's cards as soon as the ORM updates or deletes it, so dead entries
+don't sit in LRU slots.
+"""
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+from sqlalchemy import event
+
+
+class FragmentCache:
+    """Thread-safe LRU of (template, id) -> (version, html) with hit/miss counts."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, html):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, templates, object_id):
+        """Drop the cards rendered from templates for one object."""
+        with self._lock:
+            for template in templates:
+                self._entries.pop((template, object_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def render(self, env, template, obj, version, **context):
+        """Return the cached card for obj at version, rendering it on a miss."""
+        key = (template, obj.id)
+        html = self.get(key, version)
+        if html is None:
+            html = env.get_template(template).render(**context)
+            self.set(key, version, html)
+        return Markup(html)
+
+    def watch(self, model, *templates):
+        """Discard model's cards when the ORM updates or deletes a row."""
+        def forget(mapper, connection, target):
+            self.discard(templates, target.id)
+
+        event.listen(model, "after_update", forget)
+        event.listen(model, "after_delete", forget)
@@ -0,0 +1,13 @@
+# gunicorn.conf.py
+# Picked up automatically when gunicorn is started from the project folder.
+
+
+def post_fork(server, worker):
+    # With --preload the app (and its connection pool) is created before
+    # forking. Drop any inherited connections so each worker opens its own
+    # instead of sharing sockets with its siblings.
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -0,0 +1,222 @@
+# importer.py
+"""
+Streaming bulk import of items from CSV or NDJSON.
+
+Rows are read one at a time from the file and written in chunks of
+chunk_size, one transaction per chunk, so memory stays flat however
+large the file is. import_items() yields a progress dict after every
+chunk; the /items/import route and the command line both report from it.
+
+    python importer.py <username> <file.csv|file.ndjson> [chunk_size]
+
+Recognised columns (case-insensitive): name, stache (name or slug),
+stache_id, category, location, condition, tags, notes.
+"""
+import csv
+import io
+import json
+import sys
+
+from models import db, Stache, Item, parse_tags, touch_staches
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 10000
+# Only the first errors are kept so a bad million-row file can't fill memory
+MAX_REPORTED_ERRORS = 100
+
+ITEM_TEXT_COLUMNS = ("name", "category", "location", "condition", "notes")
+
+COLUMN_ALIASES = {
+    "item": "name",
+    "item name": "name",
+    "title": "name",
+    "stache name": "stache",
+    "stache_name": "stache",
+    "stache slug": "stache",
+    "tags_csv": "tags",
+    "note": "notes",
+}
+
+
+def detect_format(filename):
+    """Guess 'csv' or 'ndjson' from a file name (CSV if unsure)."""
+    if filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def read_rows(fileobj, fmt):
+    """Yield (line_number, row dict or None) from a binary file object."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+def normalize_columns(raw):
+    """Lowercase headers and map aliases onto our column names."""
+    row = {}
+    for key, value in raw.items():
+        if not isinstance(key, str):
+            continue  # extra CSV cells beyond the header
+        key = key.strip().lower()
+        row[COLUMN_ALIASES.get(key, key)] = value
+    return row
+
+
+def import_items(user_id, fileobj, fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE,
+                 default_stache_id=None, create_staches=True):
+    """
+    Import items for user_id from fileobj, yielding progress after each chunk.
+
+    Rows name their stache by id, name or slug; unknown stache names are
+    created when create_staches is set, and rows without one go to
+    default_stache_id. The last progress dict has done=True.
+    """
+    # Imported here: app.py imports this module from a route
+    from app import bulk_insert_ids, create_stache, replace_item_tag_links
+
+    chunk_size = max(1, min(int(chunk_size), MAX_CHUNK_SIZE))
+
+    # Lookup table for this user's staches by id, lowercased name and slug
+    stache_ids = set()
+    stache_by_key = {}
+    for stache_id, name, slug in db.session.query(Stache.id, Stache.name, Stache.slug).filter(
+        Stache.user_id == user_id
+    ):
+        stache_ids.add(stache_id)
+        stache_by_key.setdefault(name.strip().lower(), stache_id)
+        stache_by_key[slug] = stache_id
+
+    if default_stache_id is not None and default_stache_id not in stache_ids:
+        raise ValueError("default_stache_id is not one of this user's staches.")
+
+    progress = {"rows": 0, "imported": 0, "failed": 0, "errors": [], "done": False}
+
+    def fail(line_number, message):
+        progress["failed"] += 1
+        if len(progress["errors"]) < MAX_REPORTED_ERRORS:
+            progress["errors"].append(f"line {line_number}: {message}")
+
+    def resolve_stache(row):
+        raw_id = row.get("stache_id")
+        if raw_id not in (None, ""):
+            try:
+                stache_id = int(raw_id)
+            except (TypeError, ValueError):
+                return None, "stache_id must be a number."
+            if stache_id not in stache_ids:
+                return None, "stache_id is not one of your staches."
+            return stache_id, None
+
+        key = str(row.get("stache") or "").strip()
+        if not key:
+            if default_stache_id is None:
+                return None, "no stache given."
+            return default_stache_id, None
+
+        stache_id = stache_by_key.get(key.lower())
+        if stache_id is None and create_staches:
+            stache = create_stache(user_id, key, "", "", "")
+            stache_id = stache.id
+            stache_ids.add(stache_id)
+            stache_by_key[key.lower()] = stache_id
+            stache_by_key[stache.slug] = stache_id
+        if stache_id is None:
+            return None, f"unknown stache {key!r}."
+        return stache_id, None
+
+    def write_chunk(chunk):
+        new_ids = bulk_insert_ids(Item, chunk)
+        touch_staches(values["stache_id"] for values in chunk)
+        replace_item_tag_links({
+            item_id: values["tags_csv"]
+            for item_id, values in zip(new_ids, chunk)
+            if values["tags_csv"]
+        })
+        db.session.commit()
+        # Nothing from this chunk is needed again; keep the session small
+        db.session.expunge_all()
+        progress["imported"] += len(chunk)
+
+    chunk = []
+    for line_number, raw in read_rows(fileobj, fmt):
+        progress["rows"] += 1
+        if raw is None:
+            fail(line_number, "not a JSON object.")
+            continue
+
+        row = normalize_columns(raw)
+        values = {}
+        for column in ITEM_TEXT_COLUMNS:
+            value = row.get(column)
+            values[column] = "" if value is None else str(value).strip()
+        if not values["name"]:
+            fail(line_number, "name is required.")
+            continue
+
+        stache_id, error = resolve_stache(row)
+        if error:
+            fail(line_number, error)
+            continue
+
+        tags = row.get("tags") or ""
+        if isinstance(tags, list):
+            tags = ",".join(str(t) for t in tags)
+
+        values["stache_id"] = stache_id
+        values["tags_csv"] = ",".join(parse_tags(str(tags)))
+        values["notes"] = values["notes"] or None
+        chunk.append(values)
+
+        if len(chunk) >= chunk_size:
+            write_chunk(chunk)
+            chunk = []
+            yield dict(progress)
+
+    if chunk:
+        write_chunk(chunk)
+
+    progress["done"] = True
+    yield dict(progress)
+
+
+if __name__ == "__main__":
+    from app import app
+    from models import User
+
+    if len(sys.argv) not in (3, 4):
+        sys.exit(f"usage: python {sys.argv[0]} <username> <file> [chunk_size]")
+
+    username, path = sys.argv[1], sys.argv[2]
+    chunk_size = int(sys.argv[3]) if len(sys.argv) == 4 else DEFAULT_CHUNK_SIZE
+
+    with app.app_context():
+        user = User.query.filter_by(username=username).first()
+        if user is None:
+            sys.exit(f"No user named {username!r}.")
+        user_id = user.id
+
+        with open(path, "rb") as fileobj:
+            for progress in import_items(user_id, fileobj, detect_format(path), chunk_size):
+                print(
+                    f"{progress['rows']} rows read, {progress['imported']} imported, "
+                    f"{progress['failed']} skipped",
+                    flush=True,
+                )
+
+        for error in progress["errors"]:
+            print(f"  {error}")
@@ -0,0 +1,123 @@
+# metrics.py
+"""
+In-process request and SQL metrics, rendered in the Prometheus text format.
+
+app.py times every request and every SQL statement it issues (through
+SQLAlchemy cursor events) and reports them here once the request ends.
+The numbers are per process: with several gunicorn workers each one
+keeps its own, so a scrape of /metrics sees the worker that answered it.
+"""
+import threading
+from collections import defaultdict
+
+# Upper bounds (seconds) for the request latency histogram
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for the statements-per-request histogram
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects it."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+def _labels(**labels):
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Per-endpoint request counts, latency, and SQL statement counts and time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)  # (endpoint, method, status) -> count
+        self.latency = {}  # endpoint -> Histogram of seconds
+        self.statements = {}  # endpoint -> Histogram of statements per request
+        self.db_seconds = defaultdict(float)  # endpoint -> total time in SQL
+        self.slow_requests = defaultdict(int)  # endpoint -> count over the threshold
+
+    def observe_request(self, endpoint, method, status, seconds,
+                        statement_count, db_seconds, slow=False):
+        with self._lock:
+            self.requests[(endpoint, method, status)] += 1
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram(LATENCY_BUCKETS)
+                self.statements[endpoint] = Histogram(STATEMENT_BUCKETS)
+            self.latency[endpoint].observe(seconds)
+            self.statements[endpoint].observe(statement_count)
+            self.db_seconds[endpoint] += db_seconds
+            if slow:
+                self.slow_requests[endpoint] += 1
+
+    def render(self, extra=()):
+        """
+        Return every metric in the Prometheus text exposition format.
+
+        extra is an iterable of (name, type, help, value) for values kept
+        elsewhere, such as cache counters.
+        """
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, help_text, histograms):
+            header(name, "histogram", help_text)
+            for endpoint, hist in sorted(histograms.items()):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{name}_bucket{_labels(endpoint=endpoint, le=bound)} {count}")
+                lines.append(f'{name}_bucket{_labels(endpoint=endpoint, le="+Inf")} {hist.total}')
+                lines.append(f"{name}_sum{_labels(endpoint=endpoint)} {_number(hist.sum)}")
+                lines.append(f"{name}_count{_labels(endpoint=endpoint)} {hist.total}")
+
+        with self._lock:
+            header("stache_http_requests_total", "counter", "Requests by endpoint, method and status.")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                labels = _labels(endpoint=endpoint, method=method, status=status)
+                lines.append(f"stache_http_requests_total{labels} {count}")
+
+            histogram(
+                "stache_http_request_duration_seconds",
+                "Time from request start to the end of the response.",
+                self.latency,
+            )
+            histogram(
+                "stache_db_statements_per_request",
+                "SQL statements issued by one request.",
+                self.statements,
+            )
+
+            header("stache_db_seconds_total", "counter", "Time spent executing SQL, by endpoint.")
+            for endpoint, seconds in sorted(self.db_seconds.items()):
+                lines.append(f"stache_db_seconds_total{_labels(endpoint=endpoint)} {_number(seconds)}")
+
+            header("stache_slow_requests_total", "counter", "Requests over the slow-request threshold.")
+            for endpoint, count in sorted(self.slow_requests.items()):
+                lines.append(f"stache_slow_requests_total{_labels(endpoint=endpoint)} {count}")
+
+        for name, kind, help_text, value in extra:
+            header(name, kind, help_text)
+            lines.append(f"{name} {_number(value)}")
+
+        return "\n".join(lines) + "\n"
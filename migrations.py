@@ -0,0 +1,311 @@
+# migrations.py
+"""
+Versioned schema migrations.
+
+New databases are built with db.create_all() and stamped at the latest
+version. Existing databases are upgraded in place:
+
+    python migrations.py            # apply any pending migrations
+    python migrations.py status     # show current and latest version
+
+Each migration runs in one transaction together with its version row.
+Append new migrations to MIGRATIONS; never edit one that has shipped.
+"""
+import sys
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from models import db, backfill_tags
+
+# Kept out of db.metadata so drop_all() never forgets what was applied
+schema_migrations = sa.Table(
+    "schema_migrations",
+    sa.MetaData(),
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+# ----- Migrations -----
+# Every migration spells out its DDL as it was when it shipped, rather
+# than reading it from models.py, so editing a model later can't change
+# what an old migration does to a database upgraded from scratch. Tables
+# a migration only points foreign keys at are declared by their id alone.
+def _frozen_metadata(*referenced_tables):
+    metadata = sa.MetaData()
+    for name in referenced_tables:
+        sa.Table(name, metadata, sa.Column("id", sa.Integer, primary_key=True))
+    return metadata
+
+
+def _create(*tables):
+    connection = db.session.connection()
+    for table in tables:
+        table.create(bind=connection, checkfirst=True)
+
+
+def add_tag_tables():
+    metadata = _frozen_metadata("items", "staches")
+    _create(
+        sa.Table(
+            "tags", metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("name", sa.String(80), unique=True, nullable=False),
+        ),
+        sa.Table(
+            "item_tags", metadata,
+            sa.Column("item_id", sa.Integer, sa.ForeignKey("items.id"), primary_key=True),
+            sa.Column("tag_id", sa.Integer, sa.ForeignKey("tags.id"), primary_key=True),
+            sa.Index("ix_item_tags_tag_id_item_id", "tag_id", "item_id"),
+        ),
+        sa.Table(
+            "stache_tags", metadata,
+            sa.Column("stache_id", sa.Integer, sa.ForeignKey("staches.id"), primary_key=True),
+            sa.Column("tag_id", sa.Integer, sa.ForeignKey("tags.id"), primary_key=True),
+            sa.Index("ix_stache_tags_tag_id_stache_id", "tag_id", "stache_id"),
+        ),
+    )
+    backfill_tags()
+
+
+def add_item_search_index():
+    if db.engine.dialect.name != "sqlite":
+        return
+    for statement in (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            name, category, location, tags_csv, notes,
+            content='items', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+            INSERT INTO items_fts(rowid, name, category, location, tags_csv, notes)
+            VALUES (new.id, new.name, new.category, new.location, new.tags_csv, new.notes);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name, category, location, tags_csv, notes)
+            VALUES ('delete', old.id, old.name, old.category, old.location, old.tags_csv, old.notes);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS items_fts_au AFTER UPDATE ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name, category, location, tags_csv, notes)
+            VALUES ('delete', old.id, old.name, old.category, old.location, old.tags_csv, old.notes);
+            INSERT INTO items_fts(rowid, name, category, location, tags_csv, notes)
+            VALUES (new.id, new.name, new.category, new.location, new.tags_csv, new.notes);
+        END
+        """,
+        "INSERT INTO items_fts(items_fts) VALUES ('rebuild')",
+    ):
+        db.session.execute(sa.text(statement))
+
+
+def add_lookup_indexes():
+    for name, table, columns in (
+        ("ix_staches_user_id_name", "staches", "user_id, name"),
+        ("ix_items_stache_id_name", "items", "stache_id, name"),
+        ("ix_items_name", "items", "name"),
+        ("ix_projects_user_id_created_at", "projects", "user_id, created_at"),
+        ("ix_projects_stache_id", "projects", "stache_id"),
+        ("ix_project_tasks_project_id_created_at", "project_tasks", "project_id, created_at"),
+        ("ix_project_tasks_item_id", "project_tasks", "item_id"),
+    ):
+        db.session.execute(sa.text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def add_item_updated_at():
+    connection = db.session.connection()
+    columns = {c["name"] for c in sa.inspect(connection).get_columns("items")}
+    if "updated_at" not in columns:
+        db.session.execute(sa.text("ALTER TABLE items ADD COLUMN updated_at TIMESTAMP"))
+    db.session.execute(
+        sa.text("UPDATE items SET updated_at = :now WHERE updated_at IS NULL"),
+        {"now": datetime.utcnow()},
+    )
+
+
+def add_reminder_tables():
+    metadata = _frozen_metadata("users", "items")
+    _create(
+        sa.Table(
+            "reminders", metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item_id", sa.Integer, sa.ForeignKey("items.id"), nullable=False, index=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("recurrence", sa.String(10), nullable=False),
+            sa.Column("interval", sa.Integer, nullable=False),
+            sa.Column("starts_at", sa.DateTime, nullable=False),
+            sa.Column("next_due_at", sa.DateTime),
+            sa.Column("last_notified_at", sa.DateTime),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("updated_at", sa.DateTime),
+            sa.Index("ix_reminders_next_due_at", "next_due_at"),
+            sa.Index("ix_reminders_user_id_next_due_at", "user_id", "next_due_at"),
+        ),
+        sa.Table(
+            "notifications", metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("reminder_id", sa.Integer, sa.ForeignKey("reminders.id"), index=True),
+            sa.Column("item_id", sa.Integer, sa.ForeignKey("items.id"), index=True),
+            sa.Column("message", sa.String(400), nullable=False),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("read_at", sa.DateTime),
+            sa.Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+        ),
+    )
+
+
+def add_warranty_tables():
+    metadata = _frozen_metadata("users", "items")
+    _create(
+        sa.Table(
+            "warranties", metadata,
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item_id", sa.Integer, sa.ForeignKey("items.id"), nullable=False, index=True),
+            sa.Column("provider", sa.String(200)),
+            sa.Column("purchase_date", sa.Date),
+            sa.Column("expires_on", sa.Date, nullable=False),
+            sa.Column("document_ref", sa.String(500)),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("updated_at", sa.DateTime),
+            sa.Index("ix_warranties_user_id_expires_on", "user_id", "expires_on"),
+            sa.Index("ix_warranties_expires_on", "expires_on"),
+        ),
+        sa.Table(
+            "warranty_digests", metadata,
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("digest_date", sa.Date, nullable=False),
+            sa.Column("expiring_count", sa.Integer, nullable=False),
+            sa.Column("entries_json", sa.Text, nullable=False),
+            sa.Column("computed_at", sa.DateTime),
+        ),
+    )
+
+
+def add_email_outbox():
+    connection = db.session.connection()
+    columns = {c["name"] for c in sa.inspect(connection).get_columns("users")}
+    if "email" not in columns:
+        db.session.execute(sa.text("ALTER TABLE users ADD COLUMN email VARCHAR(255)"))
+    _create(sa.Table(
+        "outbox", _frozen_metadata("users"),
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False, index=True),
+        sa.Column("channel", sa.String(20), nullable=False),
+        sa.Column("recipient", sa.String(255), nullable=False),
+        sa.Column("subject", sa.String(200), nullable=False),
+        sa.Column("body", sa.Text, nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime, nullable=False),
+        sa.Column("last_error", sa.String(500)),
+        sa.Column("created_at", sa.DateTime),
+        sa.Column("sent_at", sa.DateTime),
+        sa.Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    ))
+
+
+def narrow_item_search_update_trigger():
+    if db.engine.dialect.name != "sqlite":
+        return
+    db.session.execute(sa.text("DROP TRIGGER IF EXISTS items_fts_au"))
+    db.session.execute(sa.text(
+        """
+        CREATE TRIGGER items_fts_au
+            AFTER UPDATE OF name, category, location, tags_csv, notes ON items BEGIN
+            INSERT INTO items_fts(items_fts, rowid, name, category, location, tags_csv, notes)
+            VALUES ('delete', old.id, old.name, old.category, old.location, old.tags_csv, old.notes);
+            INSERT INTO items_fts(rowid, name, category, location, tags_csv, notes)
+            VALUES (new.id, new.name, new.category, new.location, new.tags_csv, new.notes);
+        END
+        """
+    ))
+
+
+MIGRATIONS = [
+    (1, "Normalized tag tables backfilled from tags_csv", add_tag_tables),
+    (2, "FTS5 item search index and sync triggers", add_item_search_index),
+    (3, "Indexes on foreign keys and list sort columns", add_lookup_indexes),
+    (4, "items.updated_at for page cache validators", add_item_updated_at),
+    (5, "Maintenance reminders and in-app notifications", add_reminder_tables),
+    (6, "Warranty records and daily expiry digests", add_warranty_tables),
+    (7, "User email addresses and the delivery outbox", add_email_outbox),
+    (8, "Item search update trigger limited to indexed columns", narrow_item_search_update_trigger),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ----- Runner -----
+def current_version():
+    """Return the highest applied migration version (0 for a pre-migration database)."""
+    schema_migrations.create(bind=db.session.connection(), checkfirst=True)
+    version = db.session.execute(sa.select(sa.func.max(schema_migrations.c.version))).scalar()
+    return version or 0
+
+
+def _record(version, description):
+    db.session.execute(
+        schema_migrations.insert().values(
+            version=version,
+            description=description,
+            applied_at=datetime.utcnow(),
+        )
+    )
+
+
+def stamp_head():
+    """Mark every migration as applied (for databases built by create_all)."""
+    applied = current_version()
+    for version, description, _ in MIGRATIONS:
+        if version > applied:
+            _record(version, description)
+    db.session.commit()
+
+
+def upgrade():
+    """Apply pending migrations in order. Returns the list of versions applied."""
+    if not sa.inspect(db.engine).has_table("users"):
+        # Empty database: build the current schema directly
+        db.create_all()
+        stamp_head()
+        return []
+
+    applied = []
+    start = current_version()
+    db.session.commit()
+    for version, description, migrate in MIGRATIONS:
+        if version <= start:
+            continue
+        try:
+            migrate()
+            _record(version, description)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    from app import app
+
+    with app.app_context():
+        if sys.argv[1:] == ["status"]:
+            print(f"Schema version {current_version()} (latest {LATEST_VERSION}).")
+        else:
+            applied = upgrade()
+            if applied:
+                print(f"Applied migrations: {', '.join(map(str, applied))}.")
+            print(f"Database is at schema version {current_version()}.")
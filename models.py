@@ -1,9 +1,40 @@
 # models.py
-from datetime import datetime
+import calendar
+import json
+from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, Select, event, inspect, update
+from sqlalchemy.orm import Session
 
 db = SQLAlchemy()
 
+# Execution option app.begin_sqlite_transaction reads to start a
+# transaction with BEGIN IMMEDIATE outside a request (see begin_write)
+WRITE_LOCK_OPTION = "stache_write_lock"
+
+
+def begin_write():
+    """
+    Start the session's next transaction as a writer.
+
+    On SQLite that takes the write lock up front, so a job that reads and
+    then writes waits for busy_timeout instead of failing with "database
+    is locked". Call it with no transaction open (e.g. after a commit).
+    """
+    db.session.connection(execution_options={WRITE_LOCK_OPTION: True})
+
+
+def parse_tags(tags):
+    """Split a comma-separated tag string into a clean, de-duplicated list."""
+    names = []
+    seen = set()
+    for tag in (tags or "").split(","):
+        tag = tag.strip()
+        if tag and tag.lower() not in seen:
+            seen.add(tag.lower())
+            names.append(tag)
+    return names
+
 
 class User(db.Model):
     __tablename__ = "users"
@@ -12,11 +43,17 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     # For now we'll store a placeholder; later you can store a real hash
     password_hash = db.Column(db.String(255), nullable=False, default="dev-only")
+    # Optional: reminders are also emailed here when set
+    email = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class Stache(db.Model):
     __tablename__ = "staches"
+    __table_args__ = (
+        # "this user's staches", sorted by name for dropdowns
+        db.Index("ix_staches_user_id_name", "user_id", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -34,6 +71,7 @@ class Stache(db.Model):
 
     user = db.relationship("User", backref=db.backref("staches", lazy=True))
     items = db.relationship("Item", backref="stache", lazy=True)
+    tag_entries = db.relationship("Tag", secondary="stache_tags", lazy=True)
 
     @property
     def tags(self):
@@ -41,39 +79,289 @@ class Stache(db.Model):
             return []
         return [t.strip() for t in self.tags_csv.split(",")]
 
+    def set_tags(self, tags):
+        """Store tags both as the display CSV and in the stache_tags table."""
+        names = parse_tags(tags)
+        self.tags_csv = ",".join(names)
+        self.tag_entries = Tag.for_names(names)
+
     @property
     def item_count(self):
-        return len(self.items)
+        # COUNT in SQL rather than len(self.items), which loads every row
+        return Item.query.filter_by(stache_id=self.id).count()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "slug": self.slug,
+            "description": self.description,
+            "locations": self.locations,
+            "tags": self.tags,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
 
 
 class Item(db.Model):
     __tablename__ = "items"
+    __table_args__ = (
+        # Sorted item lists per stache; SQLite appends the rowid (id),
+        # so this also serves the (name, id) keyset pagination
+        db.Index("ix_items_stache_id_name", "stache_id", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     stache_id = db.Column(db.Integer, db.ForeignKey("staches.id"), nullable=False)
 
-    name = db.Column(db.String(120), nullable=False)
+    name = db.Column(db.String(120), nullable=False, index=True)
     category = db.Column(db.String(80))
     location = db.Column(db.String(120))
     condition = db.Column(db.String(80))
     tags_csv = db.Column(db.String(255))
     notes = db.Column(db.Text)
 
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    tag_entries = db.relationship("Tag", secondary="item_tags", lazy=True)
+
     @property
     def tags(self):
         if not self.tags_csv:
             return []
         return [t.strip() for t in self.tags_csv.split(",")]
 
+    def set_tags(self, tags):
+        """Store tags both as the display CSV and in the item_tags table."""
+        names = parse_tags(tags)
+        self.tags_csv = ",".join(names)
+        self.tag_entries = Tag.for_names(names)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "stache_id": self.stache_id,
+            "name": self.name,
+            "category": self.category,
+            "location": self.location,
+            "condition": self.condition,
+            "tags": self.tags,
+            "notes": self.notes,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+# ----- Tags -----
+# tags_csv stays the display copy; these tables are what we query on.
+# The (tag_id, item_id) index is the inverted index: tag -> items.
+class Tag(db.Model):
+    __tablename__ = "tags"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Stored lowercased so "Insulated" and "insulated" are the same tag
+    name = db.Column(db.String(80), unique=True, nullable=False)
+
+    @classmethod
+    def for_names(cls, names):
+        """Return Tag rows for the given names, creating any that are missing."""
+        wanted = list(dict.fromkeys(n.strip().lower() for n in names if n.strip()))
+        if not wanted:
+            return []
+
+        existing = {t.name: t for t in cls.query.filter(cls.name.in_(wanted)).all()}
+        tags = []
+        for name in wanted:
+            tag = existing.get(name)
+            if tag is None:
+                tag = cls(name=name)
+                db.session.add(tag)
+            tags.append(tag)
+        return tags
+
+
+item_tags = db.Table(
+    "item_tags",
+    db.Column("item_id", db.Integer, db.ForeignKey("items.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tags.id"), primary_key=True),
+    db.Index("ix_item_tags_tag_id_item_id", "tag_id", "item_id"),
+)
+
+stache_tags = db.Table(
+    "stache_tags",
+    db.Column("stache_id", db.Integer, db.ForeignKey("staches.id"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tags.id"), primary_key=True),
+    db.Index("ix_stache_tags_tag_id_stache_id", "tag_id", "stache_id"),
+)
+
+
+def backfill_tags(batch_size=1000):
+    """
+    Rebuild tags / item_tags / stache_tags from the tags_csv columns.
+
+    Safe to re-run: the association tables are cleared and refilled
+    with bulk INSERTs, reading source rows in batches. The caller commits.
+    """
+    db.session.execute(item_tags.delete())
+    db.session.execute(stache_tags.delete())
+
+    tag_ids = {t.name: t.id for t in Tag.query.all()}
+
+    def copy_links(model, table, owner_column):
+        rows = (
+            db.session.query(model.id, model.tags_csv)
+            .filter(model.tags_csv.isnot(None), model.tags_csv != "")
+            .execution_options(yield_per=batch_size)
+        )
+        links = []
+        for owner_id, tags_csv in rows:
+            for name in parse_tags(tags_csv):
+                name = name.lower()
+                if name not in tag_ids:
+                    tag = Tag(name=name)
+                    db.session.add(tag)
+                    db.session.flush()
+                    tag_ids[name] = tag.id
+                links.append({owner_column: owner_id, "tag_id": tag_ids[name]})
+            if len(links) >= batch_size:
+                db.session.execute(table.insert(), links)
+                links = []
+        if links:
+            db.session.execute(table.insert(), links)
+
+    copy_links(Item, item_tags, "item_id")
+    copy_links(Stache, stache_tags, "stache_id")
+
+
+# ----- Item full-text search (SQLite FTS5) -----
+# items_fts is an external-content index over the searchable Item columns.
+# The triggers keep it in step with every INSERT/UPDATE/DELETE on items,
+# whether it comes from the ORM or from raw SQL. The update trigger only
+# fires when an indexed column is written, so bumping updated_at (every
+# tag or parent touch) doesn't rewrite the item's index entry.
+ITEM_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        name, category, location, tags_csv, notes,
+        content='items', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ai AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts(rowid, name, category, location, tags_csv, notes)
+        VALUES (new.id, new.name, new.category, new.location, new.tags_csv, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_ad AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, category, location, tags_csv, notes)
+        VALUES ('delete', old.id, old.name, old.category, old.location, old.tags_csv, old.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS items_fts_au
+    AFTER UPDATE OF name, category, location, tags_csv, notes ON items BEGIN
+        INSERT INTO items_fts(items_fts, rowid, name, category, location, tags_csv, notes)
+        VALUES ('delete', old.id, old.name, old.category, old.location, old.tags_csv, old.notes);
+        INSERT INTO items_fts(rowid, name, category, location, tags_csv, notes)
+        VALUES (new.id, new.name, new.category, new.location, new.tags_csv, new.notes);
+    END
+    """,
+    # Index whatever rows already exist (no-op on a fresh table)
+    "INSERT INTO items_fts(items_fts) VALUES ('rebuild')",
+]
+
+# Lightweight handle on the virtual table for use in ORM queries
+items_fts = db.table(
+    "items_fts",
+    db.column("rowid"),
+    db.column("rank"),
+    db.column("items_fts"),
+)
+
+for statement in ITEM_SEARCH_DDL:
+    event.listen(
+        Item.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="sqlite"),
+    )
+
+event.listen(
+    Item.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS items_fts").execute_if(dialect="sqlite"),
+)
+
+
+# ----- Parent timestamps -----
+# A stache page shows its items and a project page shows its tasks, so a
+# change to either bumps the parent's updated_at. Pages use that one
+# timestamp as their cache validator instead of scanning the children.
+# ORM writes are caught by the flush hooks below; bulk Core statements
+# bypass the ORM, so their callers use touch_staches/touch_projects.
+def _touch(table, ids, execute):
+    if not isinstance(ids, Select):
+        ids = {i for i in ids if i is not None}
+        if not ids:
+            return
+    execute(
+        update(table)
+        .where(table.c.id.in_(ids))
+        .values(updated_at=datetime.utcnow())
+    )
+
+
+def touch_staches(stache_ids):
+    """Set updated_at to now on the given staches (ids or a SELECT of ids)."""
+    _touch(Stache.__table__, stache_ids, db.session.execute)
+
+
+def touch_projects(project_ids):
+    """Set updated_at to now on the given projects (ids or a SELECT of ids)."""
+    _touch(Project.__table__, project_ids, db.session.execute)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_touched_parents(session, flush_context, instances):
+    """Note which staches/projects the ORM changes in this flush affect."""
+    staches = session.info.setdefault("touched_staches", set())
+    projects = session.info.setdefault("touched_projects", set())
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Item):
+            staches.add(obj.stache_id)
+            # Moving an item changes the stache it left, too
+            staches.update(inspect(obj).attrs.stache_id.history.deleted)
+        elif isinstance(obj, ProjectTask):
+            projects.add(obj.project_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_parents(session, flush_context):
+    execute = session.connection().execute
+    _touch(Stache.__table__, session.info.pop("touched_staches", ()), execute)
+    _touch(Project.__table__, session.info.pop("touched_projects", ()), execute)
+
 
 class Project(db.Model):
     __tablename__ = "projects"
+    __table_args__ = (
+        # The projects page lists a user's projects newest first
+        db.Index("ix_projects_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
     # mark as real foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    stache_id = db.Column(db.Integer, db.ForeignKey("staches.id"), nullable=False)
+    stache_id = db.Column(
+        db.Integer, db.ForeignKey("staches.id"), nullable=False, index=True
+    )
 
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -96,15 +384,32 @@ class Project(db.Model):
         cascade="all, delete-orphan",
     )
 
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "stache_id": self.stache_id,
+            "name": self.name,
+            "description": self.description,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
 
 class ProjectTask(db.Model):
     __tablename__ = "project_tasks"
+    __table_args__ = (
+        # A project's tasks in the order they were added
+        db.Index("ix_project_tasks_project_id_created_at", "project_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey("projects.id"), nullable=False)
 
     # correct table name here:
-    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=True)
+    item_id = db.Column(
+        db.Integer, db.ForeignKey("items.id"), nullable=True, index=True
+    )
 
     description = db.Column(db.String(255), nullable=False)
     completed = db.Column(db.Boolean, default=False)
@@ -112,3 +417,284 @@ class ProjectTask(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     item = db.relationship("Item", backref="project_tasks")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "project_id": self.project_id,
+            "item_id": self.item_id,
+            "description": self.description,
+            "completed": bool(self.completed),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# ----- Maintenance reminders -----
+RECURRENCES = ("once", "daily", "weekly", "monthly", "yearly")
+
+
+def add_months(when, months):
+    """Shift a datetime by whole months, clamping the day (Jan 31 + 1 -> Feb 28)."""
+    month_index = when.month - 1 + months
+    year, month = when.year + month_index // 12, month_index % 12 + 1
+    day = min(when.day, calendar.monthrange(year, month)[1])
+    return when.replace(year=year, month=month, day=day)
+
+
+def next_occurrence(starts_at, recurrence, interval, after):
+    """
+    Return the first occurrence of a reminder's schedule later than after.
+
+    Occurrences are counted from starts_at, so monthly reminders keep
+    their day of the month. One-off reminders have none left once their
+    time has passed (None). Missed occurrences are skipped in one step,
+    however long the reminder went unchecked. A series whose next
+    occurrence would fall past year 9999 ends there (None) too.
+    """
+    if starts_at > after:
+        return starts_at
+    if recurrence not in RECURRENCES or recurrence == "once":
+        return None
+    interval = max(1, interval or 1)
+
+    try:
+        if recurrence in ("daily", "weekly"):
+            step = timedelta(days=interval * (7 if recurrence == "weekly" else 1))
+            return starts_at + ((after - starts_at) // step + 1) * step
+
+        months = interval * (12 if recurrence == "yearly" else 1)
+        elapsed = (after.year - starts_at.year) * 12 + after.month - starts_at.month
+        count = max(1, elapsed // months)
+        occurrence = add_months(starts_at, count * months)
+        while occurrence <= after:
+            count += 1
+            occurrence = add_months(starts_at, count * months)
+        return occurrence
+    except (OverflowError, ValueError):  # beyond datetime.max
+        return None
+
+
+class Reminder(db.Model):
+    __tablename__ = "reminders"
+    __table_args__ = (
+        # The scheduler range-scans next_due_at <= now; fired one-off
+        # reminders drop out of the index by going NULL
+        db.Index("ix_reminders_next_due_at", "next_due_at"),
+        # The home page lists a user's next reminders
+        db.Index("ix_reminders_user_id_next_due_at", "user_id", "next_due_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False, index=True)
+
+    title = db.Column(db.String(200), nullable=False)
+    recurrence = db.Column(db.String(10), nullable=False, default="once")
+    interval = db.Column(db.Integer, nullable=False, default=1)
+
+    # Naive UTC, like every timestamp here: compared with utcnow() by scheduler.py
+    starts_at = db.Column(db.DateTime, nullable=False)
+    next_due_at = db.Column(db.DateTime)
+    last_notified_at = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    item = db.relationship("Item")
+
+    @property
+    def schedule(self):
+        """Human-readable recurrence, e.g. 'every 3 months'."""
+        if self.recurrence == "once":
+            return "once"
+        unit = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}[self.recurrence]
+        if self.interval == 1:
+            return f"every {unit}"
+        return f"every {self.interval} {unit}s"
+
+
+class Notification(db.Model):
+    __tablename__ = "notifications"
+    __table_args__ = (
+        # A user's newest notifications first, and their unread count
+        db.Index("ix_notifications_user_id_created_at", "user_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # Kept (as NULL) after the reminder or item is deleted
+    # Indexed like every foreign key: deleting a reminder or item looks
+    # up (and with foreign_keys on, checks) the notifications pointing at it
+    reminder_id = db.Column(db.Integer, db.ForeignKey("reminders.id"), nullable=True, index=True)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=True, index=True)
+
+    message = db.Column(db.String(400), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)
+
+
+# ----- Warranties -----
+class Warranty(db.Model):
+    __tablename__ = "warranties"
+    __table_args__ = (
+        # "Expiring in the next N days" for one user is one range scan
+        db.Index("ix_warranties_user_id_expires_on", "user_id", "expires_on"),
+        # The daily digest job scans the window across all users
+        db.Index("ix_warranties_expires_on", "expires_on"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False, index=True)
+
+    provider = db.Column(db.String(200))
+    purchase_date = db.Column(db.Date)
+    expires_on = db.Column(db.Date, nullable=False)
+    # Where the paperwork lives: a URL, a file path, a drawer...
+    document_ref = db.Column(db.String(500))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    item = db.relationship("Item")
+
+
+def utc_today():
+    """Today in UTC: what digests are keyed by and expiry dates are compared with."""
+    return datetime.utcnow().date()
+
+
+# How far ahead the home page digest looks, and how many warranties it names
+WARRANTY_DIGEST_DAYS = 30
+WARRANTY_DIGEST_ENTRIES = 5
+
+
+class WarrantyDigest(db.Model):
+    """One user's precomputed 'expiring soon' summary for digest_date."""
+
+    __tablename__ = "warranty_digests"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    digest_date = db.Column(db.Date, nullable=False)
+    expiring_count = db.Column(db.Integer, nullable=False, default=0)
+    # JSON list of the soonest warranties: item_id, item_name, provider, expires_on
+    entries_json = db.Column(db.Text, nullable=False, default="[]")
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def entries(self):
+        return json.loads(self.entries_json or "[]")
+
+
+def compute_warranty_digests(today, user_id=None):
+    """
+    Build digest rows for today, for one user or for everyone.
+
+    A single range scan over expires_on in [today, today + window], with
+    window functions for each user's count and soonest entries. Users
+    with nothing expiring get no row from the all-users run.
+    """
+    horizon = today + timedelta(days=WARRANTY_DIGEST_DAYS)
+    criteria = [Warranty.expires_on >= today, Warranty.expires_on <= horizon]
+    if user_id is not None:
+        criteria.append(Warranty.user_id == user_id)
+
+    ranked = (
+        db.select(
+            Warranty.user_id, Warranty.item_id, Warranty.provider, Warranty.expires_on,
+            Item.name.label("item_name"),
+            db.func.row_number().over(
+                partition_by=Warranty.user_id,
+                order_by=(Warranty.expires_on, Warranty.id),
+            ).label("position"),
+            db.func.count().over(partition_by=Warranty.user_id).label("total"),
+        )
+        .join(Item, Warranty.item_id == Item.id)
+        .where(*criteria)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(ranked)
+        .where(ranked.c.position <= WARRANTY_DIGEST_ENTRIES)
+        .order_by(ranked.c.user_id, ranked.c.position)
+    )
+
+    digests = {}
+    for row in rows:
+        digest = digests.setdefault(row.user_id, {
+            "user_id": row.user_id,
+            "digest_date": today,
+            "expiring_count": row.total,
+            "entries": [],
+        })
+        digest["entries"].append({
+            "item_id": row.item_id,
+            "item_name": row.item_name,
+            "provider": row.provider,
+            "expires_on": row.expires_on.isoformat(),
+        })
+    if user_id is not None and user_id not in digests:
+        digests[user_id] = {
+            "user_id": user_id, "digest_date": today, "expiring_count": 0, "entries": [],
+        }
+
+    now = datetime.utcnow()
+    return [
+        {
+            "user_id": digest["user_id"],
+            "digest_date": digest["digest_date"],
+            "expiring_count": digest["expiring_count"],
+            "entries_json": json.dumps(digest["entries"]),
+            "computed_at": now,
+        }
+        for digest in digests.values()
+    ]
+
+
+def refresh_warranty_digests(today):
+    """Replace every user's digest with today's. The caller commits."""
+    rows = compute_warranty_digests(today)
+    db.session.execute(WarrantyDigest.__table__.delete())
+    if rows:
+        db.session.execute(WarrantyDigest.__table__.insert(), rows)
+    return len(rows)
+
+
+# ----- Outbox -----
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+
+class OutboxMessage(db.Model):
+    """
+    A message waiting for delivery.py to send it.
+
+    Rows are written in the same transaction as whatever caused them (the
+    scheduler firing a reminder), so nothing is sent for work that rolled
+    back and nothing is lost if the sender is down.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (
+        # The worker's claim: pending rows due now, oldest first
+        db.Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+
+    channel = db.Column(db.String(20), nullable=False, default="email")
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+
+    status = db.Column(db.String(10), nullable=False, default=OUTBOX_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # When the row may next be claimed: now for new rows, the backoff after
+    # a failure, and the claim's lease while a worker is sending it
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500))
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
@@ -0,0 +1,83 @@
+# ratelimit.py
+"""
+In-process token-bucket rate limiter for the password forms.
+
+Each rule is a bucket size (the burst allowed at once) and a refill rate
+per minute. app.py checks the buckets for a request's IP address and
+username before it computes a single password hash, so a flood of
+guesses is turned away for the cost of a dictionary lookup.
+
+Buckets live in this process only: with several gunicorn workers each
+keeps its own, so the effective limit is the per-worker limit times the
+number of workers. The least recently used buckets are dropped once
+max_keys is reached, which at worst hands a key a fresh (full) bucket.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class RateLimiter:
+    """Named token-bucket rules, each holding one bucket per key."""
+
+    def __init__(self, rules, max_keys=10000):
+        for name, (burst, per_minute) in rules.items():
+            # A bucket that never refills would lock its key out for good
+            if burst < 1 or not per_minute > 0:
+                raise ValueError(
+                    f"Rate limit {name!r} needs a burst of at least 1 and a positive "
+                    f"rate per minute, got ({burst}, {per_minute})."
+                )
+        # rule name -> (burst, refill tokens per second)
+        self.rules = {
+            name: (float(burst), per_minute / 60.0)
+            for name, (burst, per_minute) in rules.items()
+        }
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = OrderedDict()  # (rule, key) -> [tokens, monotonic time]
+        self._lock = threading.Lock()
+
+    def _bucket(self, rule, key, now):
+        burst, rate = self.rules[rule]
+        bucket = self._buckets.get((rule, key))
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[(rule, key)] = bucket
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets.move_to_end((rule, key))
+        return bucket
+
+    def take(self, *checks):
+        """
+        Take one token from each (rule, key) bucket, all or nothing.
+
+        Returns 0.0 when the request may go ahead, otherwise the seconds
+        until every bucket has a token again (and nothing is taken).
+        """
+        now = time.monotonic()
+        with self._lock:
+            buckets = [(rule, self._bucket(rule, key, now)) for rule, key in checks]
+            wait = 0.0
+            for rule, (tokens, _) in buckets:
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / self.rules[rule][1])
+            if wait:
+                self.rejected += 1
+                return wait
+            for _, bucket in buckets:
+                bucket[0] -= 1
+            return 0.0
+
+    def reset(self, rule, key):
+        """Refill one bucket, e.g. a username's after a successful login."""
+        with self._lock:
+            self._buckets.pop((rule, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
@@ -0,0 +1,208 @@
+# scheduler.py
+"""
+Maintenance reminder scheduler: turns due reminders into notifications.
+
+Run it as its own long-lived process next to the web workers:
+
+    python scheduler.py             # run until stopped (Ctrl+C / SIGTERM)
+    python scheduler.py --once      # fire whatever is due now and exit
+
+Due reminders are found with a range scan on the next_due_at index and
+fired in batches: one INSERT for the batch's notifications, one for the
+outbox rows of users with an email address (sent by delivery.py), and
+one executemany UPDATE moving each reminder to its next occurrence, in
+one transaction per batch. Between runs the process sleeps until the next
+due time, taken from a min-heap of the soonest upcoming reminders, so
+it never polls the table row by row. The heap is reloaded at least
+every --max-sleep seconds to pick up reminders added or edited since.
+
+On Postgres the batch SELECT uses FOR UPDATE SKIP LOCKED, so more than
+one scheduler can run; on SQLite run just one. Its write transactions
+start with BEGIN IMMEDIATE there (models.begin_write), like the web
+workers' POSTs, and a pass that still fails (e.g. the database stayed
+locked past busy_timeout) is rolled back and retried on the next one.
+
+The same process rebuilds the per-user warranty digests (what the home
+page shows as expiring soon) once per UTC day, at startup and whenever
+the date rolls over.
+"""
+import argparse
+import heapq
+import signal
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from models import (
+    db, User, Stache, Item, Reminder, Notification, OutboxMessage, begin_write,
+    next_occurrence, refresh_warranty_digests, utc_today,
+)
+
+BATCH_SIZE = 1000
+# Upcoming due times kept in the wakeup heap
+LOOKAHEAD = 1000
+# Longest sleep before looking for new or edited reminders
+MAX_SLEEP_SECONDS = 30
+# Pause after a pass that failed on the database
+RETRY_SECONDS = 5
+
+
+def reminder_message(stache_name, item_name, item_id, title):
+    """Format a notification like the README: [Camping]-Headlamp [2] [!Replace Batteries]."""
+    return f"[{stache_name}]-{item_name} [{item_id}] [!{title}]"[:400]
+
+
+def fire_due(now, batch_size=BATCH_SIZE):
+    """Notify every reminder due at or before now. Returns how many fired."""
+    fired = 0
+    while True:
+        begin_write()
+        rows = db.session.execute(
+            select(
+                Reminder.id, Reminder.user_id, Reminder.item_id, Reminder.title,
+                Reminder.recurrence, Reminder.interval, Reminder.starts_at,
+                Item.name.label("item_name"), Stache.name.label("stache_name"), User.email,
+            )
+            .join(Item, Reminder.item_id == Item.id)
+            .join(Stache, Item.stache_id == Stache.id)
+            .join(User, Reminder.user_id == User.id)
+            .where(Reminder.next_due_at <= now)
+            .order_by(Reminder.next_due_at)
+            .limit(batch_size)
+            .with_for_update(of=Reminder, skip_locked=True)
+        ).all()
+        if not rows:
+            db.session.commit()
+            break
+
+        db.session.execute(insert(Notification), [
+            {
+                "user_id": row.user_id,
+                "reminder_id": row.id,
+                "item_id": row.item_id,
+                "message": reminder_message(row.stache_name, row.item_name, row.item_id, row.title),
+                "created_at": now,
+            }
+            for row in rows
+        ])
+        emails = [
+            {
+                "user_id": row.user_id,
+                "channel": "email",
+                "recipient": row.email,
+                "subject": f"Reminder: {row.title}"[:200],
+                "body": reminder_message(row.stache_name, row.item_name, row.item_id, row.title),
+                "next_attempt_at": now,
+                "created_at": now,
+            }
+            for row in rows
+            if row.email
+        ]
+        if emails:
+            db.session.execute(insert(OutboxMessage), emails)
+        # ORM bulk UPDATE by primary key: one executemany for the batch
+        db.session.execute(update(Reminder), [
+            {
+                "id": row.id,
+                "next_due_at": next_occurrence(row.starts_at, row.recurrence, row.interval, now),
+                "last_notified_at": now,
+            }
+            for row in rows
+        ])
+        db.session.commit()
+
+        fired += len(rows)
+        if len(rows) < batch_size:
+            break
+    return fired
+
+
+def upcoming(now, limit=LOOKAHEAD):
+    """Return a heap of (next_due_at, id) for the soonest reminders after now."""
+    heap = [
+        (due, reminder_id)
+        for reminder_id, due in db.session.execute(
+            select(Reminder.id, Reminder.next_due_at)
+            .where(Reminder.next_due_at > now)
+            .order_by(Reminder.next_due_at)
+            .limit(limit)
+        )
+    ]
+    db.session.commit()  # don't hold a read transaction open while asleep
+    heapq.heapify(heap)
+    return heap
+
+
+def refresh_digests(today):
+    """Rebuild every user's warranty digest for today. Returns how many users have one."""
+    begin_write()
+    written = refresh_warranty_digests(today)
+    db.session.commit()
+    return written
+
+
+def run(stop, batch_size=BATCH_SIZE, lookahead=LOOKAHEAD, max_sleep=MAX_SLEEP_SECONDS):
+    """Fire reminders as they fall due until the stop event is set."""
+    heap = []
+    loaded_at = float("-inf")
+    digest_date = None
+
+    while not stop.is_set():
+        now = datetime.utcnow()
+        try:
+            today = utc_today()
+            if today != digest_date:
+                written = refresh_digests(today)
+                digest_date = today
+                print(f"{now.isoformat(timespec='seconds')} refreshed {written} warranty digests", flush=True)
+
+            fired = fire_due(now, batch_size)
+            if fired:
+                print(f"{now.isoformat(timespec='seconds')} fired {fired} reminders", flush=True)
+
+            while heap and heap[0][0] <= now:
+                heapq.heappop(heap)
+            if not heap or time.monotonic() - loaded_at >= max_sleep:
+                heap = upcoming(now, lookahead)
+                loaded_at = time.monotonic()
+        except OperationalError as error:
+            # Batches already committed stay done; the rest is retried
+            db.session.rollback()
+            print(f"{now.isoformat(timespec='seconds')} database error, retrying: {error.orig}", flush=True)
+            stop.wait(RETRY_SECONDS)
+            continue
+
+        # Sleep until the soonest known due time, but not past the next reload
+        # (which also notices the date changing for the digests)
+        until_reload = max_sleep - (time.monotonic() - loaded_at)
+        if heap:
+            until_due = (heap[0][0] - datetime.utcnow()).total_seconds()
+            stop.wait(max(0.0, min(until_due, until_reload)))
+        else:
+            stop.wait(max(0.0, until_reload))
+
+
+if __name__ == "__main__":
+    from app import app
+
+    parser = argparse.ArgumentParser(description="Fire maintenance reminders.")
+    parser.add_argument("--once", action="store_true", help="fire what is due now, then exit")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--lookahead", type=int, default=LOOKAHEAD)
+    parser.add_argument("--max-sleep", type=float, default=MAX_SLEEP_SECONDS)
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.once:
+            now = datetime.utcnow()
+            print(f"Refreshed {refresh_digests(utc_today())} warranty digests.")
+            print(f"Fired {fire_due(now, args.batch_size)} reminders.")
+        else:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            print("Reminder scheduler running.", flush=True)
+            run(stop, args.batch_size, args.lookahead, args.max_sleep)
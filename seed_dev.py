@@ -1,10 +1,12 @@
 from datetime import datetime
 from app import app
-from models import db, User, Stache, Item, Project, ProjectTask
+from models import db, User, Stache, Item, Project, ProjectTask, backfill_tags
+from migrations import stamp_head
 
 with app.app_context():
     db.drop_all()
     db.create_all()
+    stamp_head()  # create_all already built the latest schema
 
     # User
     bryce = User(username="bryce", password_hash="dev-only")
@@ -141,5 +143,9 @@ with app.app_context():
     ])
 
 
+    db.session.commit()
+
+    # Fill the normalized tag tables from the tags_csv values above
+    backfill_tags()
     db.session.commit()
     print("Dev database seeded with demo data.")
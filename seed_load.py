@@ -0,0 +1,235 @@
+# seed_load.py
+"""
+Generate a large synthetic dataset for performance work.
+
+Unlike seed_dev.py (one user, a handful of rows), every size here is a
+parameter, and rows go in with bulk INSERTs in chunks, so a few hundred
+thousand items take seconds rather than minutes. Tags are drawn from a
+Zipf-like distribution: a few tags are on many items, most on few.
+
+    python seed_load.py --users 20 --staches 10 --items 500
+    python seed_load.py --append --users 5        # keep existing data
+
+Users are named load0001, load0002, ... and share the password given by
+--password (default "load-password"), for benchmark.py to log in with.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import app, bulk_insert_ids, hash_password
+from models import db, User, Stache, Item, Project, ProjectTask, Tag, item_tags, stache_tags
+from migrations import stamp_head
+
+CATEGORIES = [
+    "Camping", "Electronics", "Books", "Tools", "Kitchen", "Clothing",
+    "Cables", "Storage", "Sports", "Garden", "Office", "Music",
+]
+ADJECTIVES = [
+    "Blue", "Compact", "Heavy", "Spare", "Vintage", "Waterproof", "Folding",
+    "Wireless", "Small", "Large", "Old", "Backup", "Travel", "Steel",
+]
+NOUNS = [
+    "Tent", "Lantern", "Drive", "Charger", "Notebook", "Wrench", "Pan",
+    "Jacket", "Cable", "Bin", "Ball", "Shovel", "Lamp", "Guitar", "Stove",
+    "Headlamp", "Router", "Hammer", "Kettle", "Backpack",
+]
+LOCATIONS = ["Garage", "Closet", "Basement", "Office", "Attic", "Shed", "Desk drawer"]
+CONDITIONS = ["new", "good", "fair", "worn"]
+STATUSES = ["planning", "in-progress", "completed"]
+
+
+def tag_picker(rng, tag_count, skew):
+    """Return pick(n) -> up to n distinct tag names, rank r weighted 1/r^skew."""
+    names = [f"tag-{rank:04d}" for rank in range(1, tag_count + 1)]
+    weights = [1 / rank ** skew for rank in range(1, tag_count + 1)]
+
+    def pick(n):
+        if not names or n <= 0:
+            return []
+        return list(dict.fromkeys(rng.choices(names, weights, k=n)))
+
+    return pick
+
+
+def generate(users=10, staches=5, items=200, projects=3, tasks=5, tags=200,
+             tag_skew=1.1, max_tags=4, seed=1, chunk_size=5000,
+             password="load-password", append=False):
+    """
+    Insert the dataset and return the row counts written.
+
+    Each user gets `staches` staches with `items` items each, and
+    `projects` projects with `tasks` tasks each; about half the tasks
+    link to an item in the project's stache.
+    """
+    rng = random.Random(seed)
+    pick_tags = tag_picker(rng, tags, tag_skew)
+    now = datetime.utcnow()
+    counts = dict.fromkeys(("users", "staches", "items", "projects", "tasks"), 0)
+
+    if not append:
+        db.drop_all()
+        db.create_all()
+        stamp_head()
+
+    # Tag rows: reuse any that exist, bulk insert the rest
+    tag_ids = {name: tag_id for tag_id, name in db.session.query(Tag.id, Tag.name)}
+    missing = [f"tag-{rank:04d}" for rank in range(1, tags + 1)]
+    missing = [name for name in missing if name not in tag_ids]
+    if missing:
+        new_ids = bulk_insert_ids(Tag, [{"name": name} for name in missing])
+        tag_ids.update(zip(missing, new_ids))
+
+    # Users: hashing is deliberately slow, so every user shares one hash
+    first = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    password_hash = hash_password(password)
+    user_ids = bulk_insert_ids(User, [
+        {"username": f"load{first + n:04d}", "password_hash": password_hash, "created_at": now}
+        for n in range(users)
+    ])
+    counts["users"] = len(user_ids)
+    db.session.commit()
+
+    # Staches, with their tag links
+    stache_rows, stache_tag_names = [], []
+    stache_owner = []
+    for user_id in user_ids:
+        for n in range(1, staches + 1):
+            names = pick_tags(rng.randint(0, max_tags))
+            stache_rows.append({
+                "user_id": user_id,
+                "name": f"{rng.choice(CATEGORIES)} {n}",
+                "slug": f"u{user_id}-stache-{n}",
+                "description": f"Synthetic stache {n} for load testing.",
+                "locations": ", ".join(rng.sample(LOCATIONS, 2)),
+                "tags_csv": ", ".join(names),
+                "created_at": now - timedelta(days=rng.randint(0, 720)),
+                "updated_at": now,
+            })
+            stache_tag_names.append(names)
+            stache_owner.append(user_id)
+
+    stache_ids = []
+    for start in range(0, len(stache_rows), chunk_size):
+        chunk = stache_rows[start:start + chunk_size]
+        new_ids = bulk_insert_ids(Stache, chunk)
+        links = [
+            {"stache_id": stache_id, "tag_id": tag_ids[name]}
+            for stache_id, names in zip(new_ids, stache_tag_names[start:start + chunk_size])
+            for name in names
+        ]
+        if links:
+            db.session.execute(stache_tags.insert(), links)
+        stache_ids.extend(new_ids)
+        db.session.commit()
+    counts["staches"] = len(stache_ids)
+
+    # Items, written in chunks; remember a few ids per stache for tasks
+    sample_items = {}
+    pending, pending_tags = [], []
+
+    def flush_items():
+        new_ids = bulk_insert_ids(Item, pending)
+        links = []
+        for item_id, values, names in zip(new_ids, pending, pending_tags):
+            samples = sample_items.setdefault(values["stache_id"], [])
+            if len(samples) < 20:
+                samples.append(item_id)
+            links.extend({"item_id": item_id, "tag_id": tag_ids[name]} for name in names)
+        if links:
+            db.session.execute(item_tags.insert(), links)
+        db.session.commit()
+        counts["items"] += len(pending)
+        pending.clear()
+        pending_tags.clear()
+
+    for stache_id in stache_ids:
+        for n in range(1, items + 1):
+            names = pick_tags(rng.randint(0, max_tags))
+            pending.append({
+                "stache_id": stache_id,
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {n}",
+                "category": rng.choice(CATEGORIES),
+                "location": rng.choice(LOCATIONS),
+                "condition": rng.choice(CONDITIONS),
+                "tags_csv": ", ".join(names),
+                "notes": "Generated by seed_load.py" if rng.random() < 0.2 else None,
+                "updated_at": now,
+            })
+            pending_tags.append(names)
+            if len(pending) >= chunk_size:
+                flush_items()
+    if pending:
+        flush_items()
+
+    # Projects and tasks
+    staches_by_user = {}
+    for stache_id, user_id in zip(stache_ids, stache_owner):
+        staches_by_user.setdefault(user_id, []).append(stache_id)
+
+    project_rows = []
+    for user_id in user_ids:
+        for n in range(1, projects + 1):
+            if not staches_by_user.get(user_id):
+                break
+            project_rows.append({
+                "user_id": user_id,
+                "stache_id": rng.choice(staches_by_user[user_id]),
+                "name": f"Project {n}",
+                "description": "Synthetic project for load testing.",
+                "status": rng.choice(STATUSES),
+                "created_at": now - timedelta(days=rng.randint(0, 365)),
+                "updated_at": now,
+            })
+
+    task_rows = []
+    for start in range(0, len(project_rows), chunk_size):
+        chunk = project_rows[start:start + chunk_size]
+        for project_id, values in zip(bulk_insert_ids(Project, chunk), chunk):
+            candidates = sample_items.get(values["stache_id"], [])
+            for n in range(1, tasks + 1):
+                task_rows.append({
+                    "project_id": project_id,
+                    "item_id": rng.choice(candidates) if candidates and rng.random() < 0.5 else None,
+                    "description": f"Task {n}",
+                    "completed": rng.random() < 0.4,
+                    "created_at": values["created_at"] + timedelta(minutes=n),
+                })
+        db.session.commit()
+    counts["projects"] = len(project_rows)
+
+    for start in range(0, len(task_rows), chunk_size):
+        db.session.execute(ProjectTask.__table__.insert(), task_rows[start:start + chunk_size])
+        db.session.commit()
+    counts["tasks"] = len(task_rows)
+
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Stache dataset.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--staches", type=int, default=5, help="staches per user")
+    parser.add_argument("--items", type=int, default=200, help="items per stache")
+    parser.add_argument("--projects", type=int, default=3, help="projects per user")
+    parser.add_argument("--tasks", type=int, default=5, help="tasks per project")
+    parser.add_argument("--tags", type=int, default=200, help="size of the tag vocabulary")
+    parser.add_argument("--tag-skew", type=float, default=1.1, help="Zipf exponent for tag popularity")
+    parser.add_argument("--max-tags", type=int, default=4, help="most tags on one stache/item")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--password", default="load-password")
+    parser.add_argument("--append", action="store_true", help="add to the database instead of rebuilding it")
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        counts = generate(
+            users=args.users, staches=args.staches, items=args.items,
+            projects=args.projects, tasks=args.tasks, tags=args.tags,
+            tag_skew=args.tag_skew, max_tags=args.max_tags, seed=args.seed,
+            chunk_size=args.chunk_size, password=args.password, append=args.append,
+        )
+        elapsed = time.perf_counter() - started
+        print(", ".join(f"{count} {kind}" for kind, count in counts.items()) + f" in {elapsed:.1f}s.")
@@ -0,0 +1,50 @@
+# tests/test_api.py
+"""
+JSON ids and flags are type-checked: true == 1 in Python, so without the
+checks {"stache_id": true} would pass as the user's stache with id 1.
+"""
+import pytest
+
+
+@pytest.fixture
+def project_id(client, make):
+    stache_id = make.stache("Camping")
+    assert stache_id == 1
+    return client.post(
+        "/api/projects", json={"name": "Trip", "stache_id": stache_id}
+    ).get_json()["project"]["id"]
+
+
+def test_project_stache_id_must_be_an_id(client, project_id):
+    for stache_id in (True, 1.0, "1"):
+        response = client.post("/api/projects", json={"name": "Trip", "stache_id": stache_id})
+        assert response.status_code == 400, stache_id
+
+
+def test_task_item_id_and_completed_are_type_checked(client, make, project_id):
+    assert make.item(1, "Stove") == 1
+
+    response = client.post(f"/api/projects/{project_id}/tasks", json=[
+        {"description": "Clean it", "item_id": True},
+        {"description": "Buy fuel", "completed": 1},
+        {"description": "Pack it", "item_id": 1, "completed": True},
+    ])
+    assert response.status_code == 200
+    assert [(r["ok"], r.get("error")) for r in response.get_json()["results"]] == [
+        (False, "item_id is not one of your items."),
+        (False, "completed must be true or false."),
+        (True, None),
+    ]
+    tasks = client.get(f"/api/projects/{project_id}").get_json()["tasks"]
+    assert [(t["description"], t["item_id"], t["completed"]) for t in tasks] == [("Pack it", 1, True)]
+
+
+def test_task_update_rejects_a_non_boolean_completed(client, project_id):
+    task_id = client.post(
+        f"/api/projects/{project_id}/tasks", json=[{"description": "Buy fuel"}]
+    ).get_json()["results"][0]["id"]
+    path = f"/api/projects/{project_id}/tasks/{task_id}"
+
+    assert client.patch(path, json={"completed": "false"}).status_code == 400
+    assert client.get(f"/api/projects/{project_id}").get_json()["tasks"][0]["completed"] is False
+    assert client.patch(path, json={"completed": True}).get_json()["task"]["completed"] is True
@@ -0,0 +1,44 @@
+# tests/test_auth_limits.py
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app import auth_limiter
+from ratelimit import RateLimiter
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """The login limiter with a small per-IP burst, emptied before and after."""
+    monkeypatch.setitem(auth_limiter.rules, "ip", (2.0, 1 / 60))
+    auth_limiter.clear()
+    yield auth_limiter
+    auth_limiter.clear()
+
+
+def log_in_from(client, address, n):
+    return client.post(
+        "/login",
+        data={"username": f"nobody{n}", "password": "wrong"},
+        headers={"X-Forwarded-For": address},
+    ).status_code
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_buckets(app, monkeypatch, limiter):
+    monkeypatch.setattr(app, "wsgi_app", ProxyFix(app.wsgi_app, x_for=1))
+    client = app.test_client()
+
+    assert [log_in_from(client, "203.0.113.1", n) for n in range(3)] == [200, 200, 429]
+    # Same proxy (remote_addr), different client
+    assert log_in_from(client, "203.0.113.2", 3) == 200
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(app, limiter):
+    client = app.test_client()
+
+    assert [log_in_from(client, f"203.0.113.{n}", n) for n in range(3)] == [200, 200, 429]
+
+
+@pytest.mark.parametrize("rule", [(0, 5), (5, 0), (5, -1)])
+def test_limits_that_never_refill_are_refused_up_front(rule):
+    with pytest.raises(ValueError):
+        RateLimiter({"ip": rule})
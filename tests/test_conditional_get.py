@@ -0,0 +1,30 @@
+# tests/test_conditional_get.py
+import time
+
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={"If-None-Match": etag})
+
+
+def test_project_page_changes_when_a_linked_item_in_another_stache_is_renamed(client, make):
+    camping = make.stache("Camping")
+    garage = make.stache("Garage")
+    project_id = make.project(camping, "Trip")
+    item_id = make.item(garage, "Old Name")
+    response = client.post(f"/api/projects/{project_id}/tasks", json=[
+        {"description": "Bring it", "item_id": item_id},
+    ])
+    assert response.status_code == 201
+
+    path = f"/projects/{project_id}"
+    first = client.get(path)
+    assert "Old Name" in first.get_data(as_text=True)
+    assert revalidate(client, path, first.headers["ETag"]).status_code == 304
+
+    time.sleep(0.01)  # a distinct updated_at
+    response = client.patch("/api/items", json=[{"id": item_id, "name": "New Name"}])
+    assert response.status_code == 200
+
+    after = revalidate(client, path, first.headers["ETag"])
+    assert after.status_code == 200
+    assert "New Name" in after.get_data(as_text=True)
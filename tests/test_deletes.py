@@ -0,0 +1,77 @@
+# tests/test_deletes.py
+"""
+Stache, project and account deletes are set-based: the statements they
+run must not depend on how many items, tags, projects or tasks go with
+them. Each test deletes the same kind of thing for a user with a few rows
+and for one with many, and compares the statement counts. An executemany
+counts once per parameter set, since the ORM batches per-row DELETEs
+into one.
+"""
+import pytest
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Item, Project, ProjectTask, Stache
+
+PASSWORD = "correct horse"
+
+
+def fill(make, user_id, username, count):
+    """A stache with count tagged items, and a project with a task per item."""
+    stache_id = make.stache("Camping", user_id=user_id, slug=f"camping-{username}")
+    project_id = make.project(stache_id, "Trip", user_id=user_id)
+    for n in range(count):
+        item_id = make.item(stache_id, f"Item {n}", tags=f"tag{n}, shared")
+        make.task(project_id, f"Pack item {n}", item_id=item_id)
+    garage_id = make.stache("Garage", user_id=user_id, slug=f"garage-{username}")
+    make.project(garage_id, "Tidy up", user_id=user_id)
+    return project_id
+
+
+def users(app, make):
+    """Two users, each with a password, the first with few rows and the second with many."""
+    user_ids = [make.add_user("few"), make.add_user("many")]
+    with app.app_context():
+        for user in db.session.scalars(db.select(User).where(User.id.in_(user_ids))):
+            user.password_hash = generate_password_hash(PASSWORD, method=app.config["PASSWORD_HASH_METHOD"])
+        db.session.commit()
+    return [
+        (user_id, username, fill(make, user_id, username, count))
+        for user_id, username, count in zip(user_ids, ["few", "many"], [2, 20])
+    ]
+
+
+def executions(statements):
+    return sum(len(p) if isinstance(p, list) else 1 for p in statements.parameters)
+
+
+def remaining(app, model, user_id):
+    with app.app_context():
+        return db.session.query(model).filter_by(user_id=user_id).count()
+
+
+@pytest.mark.parametrize("target", ["stache", "project", "account"])
+def test_delete_runs_the_same_statements_for_any_number_of_rows(
+    app, make, new_client, statements, target
+):
+    counts = []
+    for user_id, username, project_id in users(app, make):
+        client = new_client(user_id, username)
+        path, data = {
+            "stache": (f"/staches/camping-{username}/delete", None),
+            "project": (f"/projects/{project_id}/delete", None),
+            "account": ("/account/delete", {"password": PASSWORD}),
+        }[target]
+        statements.clear()
+        assert client.post(path, data=data).status_code == 302
+        counts.append(executions(statements))
+
+        if target == "account":
+            assert remaining(app, Stache, user_id) == 0
+            assert remaining(app, Project, user_id) == 0
+        with app.app_context():
+            assert db.session.get(Project, project_id) is None
+            assert not db.session.query(ProjectTask).filter_by(project_id=project_id).count()
+            if target != "project":
+                assert not db.session.query(Item).join(Stache).filter(Stache.user_id == user_id).count()
+
+    assert counts[0] == counts[1], statements
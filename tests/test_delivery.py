@@ -0,0 +1,179 @@
+# tests/test_delivery.py
+"""
+The outbox worker against a stand-in for smtplib.SMTP: connections are
+pooled across messages and passes, each user's due rows go out as one
+message, and failures are retried with backoff or marked failed.
+"""
+import smtplib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import delivery
+from delivery import SMTPPool, deliver, run
+from models import db, OutboxMessage, OUTBOX_PENDING, OUTBOX_SENT, OUTBOX_FAILED
+
+
+class FakeSMTP:
+    """Records what is sent; replies[recipient] lists SMTP codes to fail with first."""
+
+    connections = []
+    sent = []
+    replies = {}
+
+    def __init__(self, host, port, timeout=None):
+        FakeSMTP.connections.append(self)
+
+    def send_message(self, message):
+        codes = FakeSMTP.replies.get(message["To"])
+        if codes:
+            code = codes.pop(0)
+            raise smtplib.SMTPDataError(code, b"try later" if code < 500 else b"no such user")
+        FakeSMTP.sent.append((self, message))
+
+    def noop(self):
+        return 250, b"OK"
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeSMTP.connections, FakeSMTP.sent, FakeSMTP.replies = [], [], {}
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    pool = SMTPPool("localhost", 1025, size=2)
+    yield pool
+    pool.close()
+
+
+def queue_messages(app, make, per_user):
+    """Queue per_user[n] reminders for user n; returns their recipients."""
+    recipients = []
+    with app.app_context():
+        for n, count in enumerate(per_user):
+            user_id = make.user if n == 0 else make.add_user(f"user{n}")
+            recipient = f"user{n}@example.com"
+            recipients.append(recipient)
+            for m in range(count):
+                db.session.add(OutboxMessage(
+                    user_id=user_id, recipient=recipient,
+                    subject=f"Reminder {m}", body=f"Reminder {m} for {recipient}",
+                ))
+        db.session.commit()
+    return recipients
+
+
+def outbox(app):
+    with app.app_context():
+        return {row.recipient: row for row in db.session.scalars(db.select(OutboxMessage))}
+
+
+def deliver_once(app, pool):
+    with app.app_context(), ThreadPoolExecutor(max_workers=pool.size) as executor:
+        return deliver(pool, executor, "stache@localhost")
+
+
+def test_messages_share_pooled_connections_across_passes(app, make, pool):
+    queue_messages(app, make, [3, 1, 2, 1])
+    assert deliver_once(app, pool) == (7, 4)
+    # One message per user, over no more connections than the pool holds
+    assert sorted(message["To"] for _, message in FakeSMTP.sent) == [
+        "user0@example.com", "user1@example.com", "user2@example.com", "user3@example.com",
+    ]
+    assert pool.connects == len(FakeSMTP.connections) <= pool.size
+
+    connects = pool.connects
+    queue_messages(app, make, [2])
+    assert deliver_once(app, pool) == (2, 1)
+    assert pool.connects == connects
+    assert {row.status for row in outbox(app).values()} == {OUTBOX_SENT}
+
+
+def test_failures_back_off_or_fail_for_good(app, make, pool):
+    temporary, permanent, fine = queue_messages(app, make, [1, 1, 1])
+    FakeSMTP.replies = {temporary: [451, 451], permanent: [550]}
+    before = datetime.utcnow()
+
+    assert deliver_once(app, pool) == (3, 1)
+    rows = outbox(app)
+    assert rows[fine].status == OUTBOX_SENT
+    assert rows[permanent].status == OUTBOX_FAILED
+    assert rows[permanent].last_error.startswith("550")
+    retry = rows[temporary]
+    assert retry.status == OUTBOX_PENDING and retry.attempts == 1
+    assert "451" in retry.last_error
+    # First retry: BACKOFF_BASE_SECONDS, less up to half for jitter
+    base = timedelta(seconds=delivery.BACKOFF_BASE_SECONDS)
+    assert before + base / 2 <= retry.next_attempt_at <= datetime.utcnow() + base
+
+    # Not due yet; once it is, the second 451 doubles the delay
+    assert deliver_once(app, pool) == (0, 0)
+    with app.app_context():
+        db.session.execute(db.update(OutboxMessage).values(next_attempt_at=datetime.utcnow()))
+        db.session.commit()
+    before = datetime.utcnow()
+    assert deliver_once(app, pool) == (1, 0)
+    retry = outbox(app)[temporary]
+    assert retry.attempts == 2
+    assert before + base <= retry.next_attempt_at <= datetime.utcnow() + 2 * base
+
+
+def test_last_attempt_marks_the_row_failed(app, make, pool):
+    recipient, = queue_messages(app, make, [1])
+    FakeSMTP.replies = {recipient: [451]}
+    with app.app_context():
+        db.session.execute(db.update(OutboxMessage).values(attempts=delivery.MAX_ATTEMPTS - 1))
+        db.session.commit()
+
+    assert deliver_once(app, pool) == (1, 0)
+    assert outbox(app)[recipient].status == OUTBOX_FAILED
+
+
+@pytest.mark.sqlite_only
+def test_claims_and_results_take_the_write_lock_up_front(app, make, pool, statements):
+    queue_messages(app, make, [2])
+    statements.clear()
+    assert deliver_once(app, pool) == (2, 1)
+    begins = [s for s in statements if s.startswith("BEGIN")]
+    assert begins and set(begins) == {"BEGIN IMMEDIATE"}
+
+
+@pytest.mark.parametrize("failing", ["claim", "record_results"])
+def test_run_survives_a_pass_that_failed_on_the_database(app, make, pool, monkeypatch, failing):
+    recipient, = queue_messages(app, make, [1])
+    stop = threading.Event()
+    passes = []
+    real_deliver, real_failing = delivery.deliver, getattr(delivery, failing)
+
+    def counting_deliver(*args):
+        passes.append(args)
+        if len(passes) == 2:
+            stop.set()
+        return real_deliver(*args)
+
+    def fails_once(*args):
+        if len(passes) == 1:
+            raise OperationalError("UPDATE", {}, sqlite3.OperationalError("database is locked"))
+        return real_failing(*args)
+
+    monkeypatch.setattr(delivery, "deliver", counting_deliver)
+    monkeypatch.setattr(delivery, failing, fails_once)
+    with app.app_context():
+        run(stop, pool, "stache@localhost", poll=0)
+
+    assert len(passes) == 2
+    row = outbox(app)[recipient]
+    if failing == "claim":
+        assert row.status == OUTBOX_SENT
+    else:
+        # Sent, but the outcome was lost: the row waits out its lease
+        assert len(FakeSMTP.sent) == 1
+        assert row.status == OUTBOX_PENDING and row.next_attempt_at > datetime.utcnow()
@@ -0,0 +1,24 @@
+# tests/test_metrics.py
+import ipaddress
+
+
+def test_metrics_are_refused_by_default(app):
+    assert app.test_client().get("/metrics").status_code == 403
+
+
+def test_metrics_need_the_right_token(app, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "s3cret")
+    client = app.test_client()
+
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "stache_http_requests_total" in response.get_data(as_text=True)
+
+
+def test_metrics_from_an_allowed_address(app, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_ALLOW_IPS", [ipaddress.ip_network("10.0.0.0/8")])
+    client = app.test_client()
+
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.1.2.3"}).status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "192.0.2.1"}).status_code == 403
@@ -0,0 +1,81 @@
+# tests/test_migrations.py
+"""
+Upgrading a pre-migration database must end at the schema create_all()
+builds for a new one, so the two kinds of install stay interchangeable.
+"""
+import pytest
+import sqlalchemy as sa
+
+from migrations import LATEST_VERSION, current_version, upgrade
+from models import db
+
+# What every migration adds, undone in reverse to get a version 0 database
+MIGRATED_TABLES = [
+    "outbox", "warranty_digests", "warranties", "notifications", "reminders",
+    "items_fts", "stache_tags", "item_tags", "tags",
+]
+MIGRATED_INDEXES = [
+    "ix_staches_user_id_name", "ix_items_stache_id_name", "ix_items_name",
+    "ix_projects_user_id_created_at", "ix_projects_stache_id",
+    "ix_project_tasks_project_id_created_at", "ix_project_tasks_item_id",
+]
+
+
+def schema():
+    """Tables, columns, indexes and triggers as SQLite reports them."""
+    connection = db.session.connection()
+    inspector = sa.inspect(connection)
+    tables = {}
+    for table in inspector.get_table_names():
+        if table == "schema_migrations" or table.startswith("items_fts_"):
+            continue
+        tables[table] = {
+            "columns": {c["name"]: c["nullable"] for c in inspector.get_columns(table)},
+            "indexes": sorted(
+                (i["name"], tuple(i["column_names"]), bool(i["unique"]))
+                for i in inspector.get_indexes(table)
+            ),
+            "foreign_keys": sorted(
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspector.get_foreign_keys(table)
+            ),
+        }
+    triggers = {
+        name: " ".join(sql.split())  # indentation differs between the two
+        for name, sql in connection.execute(sa.text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        ))
+    }
+    return tables, triggers
+
+
+def downgrade_to_version_0():
+    for trigger in ("items_fts_ai", "items_fts_ad", "items_fts_au"):
+        db.session.execute(sa.text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    for table in MIGRATED_TABLES:
+        db.session.execute(sa.text(f"DROP TABLE IF EXISTS {table}"))
+    for index in MIGRATED_INDEXES:
+        db.session.execute(sa.text(f"DROP INDEX IF EXISTS {index}"))
+    db.session.execute(sa.text("ALTER TABLE items DROP COLUMN updated_at"))
+    db.session.execute(sa.text("ALTER TABLE users DROP COLUMN email"))
+    db.session.execute(sa.text("DELETE FROM schema_migrations"))
+    db.session.commit()
+
+
+@pytest.mark.sqlite_only
+def test_upgrade_from_version_0_matches_create_all(app, make):
+    stache_id = make.stache("Camping")
+    make.item(stache_id, "Tent", tags="outdoor, shelter")
+    with app.app_context():
+        created = schema()
+        db.session.commit()
+        downgrade_to_version_0()
+        assert current_version() == 0
+
+        assert upgrade() == list(range(1, LATEST_VERSION + 1))
+        assert schema() == created
+        # The backfill and the search index picked up the existing item
+        assert db.session.execute(sa.text("SELECT count(*) FROM item_tags")).scalar() == 2
+        assert db.session.execute(sa.text(
+            "SELECT rowid FROM items_fts WHERE items_fts MATCH 'tent'"
+        )).scalar() is not None
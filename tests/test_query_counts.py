@@ -0,0 +1,34 @@
+# tests/test_query_counts.py
+"""
+Statements per page must not grow with the number of rows shown: a
+relationship touched per row in a template (an N+1) shows up here as a
+count that changes when more staches, items, projects or tasks are added.
+"""
+import pytest
+
+
+def add_rows(make, stache_ids, project_id, count, start=0):
+    for n in range(start, start + count):
+        stache_id = stache_ids[n % len(stache_ids)]
+        item_id = make.item(stache_id, f"Item {n}", tags=f"tag{n % 3}, shared")
+        make.task(project_id, f"Task {n}", item_id=item_id)
+        make.project(stache_id, f"Project {n}")
+
+
+@pytest.mark.parametrize("path", ["/items", "/projects", "/projects/{project}"])
+def test_statement_count_does_not_grow_with_rows(client, make, statements, path):
+    # Tasks link items from both staches, so not every linked item is
+    # one the project page loads anyway
+    stache_ids = [make.stache("Camping"), make.stache("Garage")]
+    project_id = make.project(stache_ids[0], "Pack for the trip")
+    path = path.format(project=project_id)
+
+    add_rows(make, stache_ids, project_id, 2)
+    statements.clear()
+    assert client.get(path).status_code == 200
+    few = len(statements)
+
+    add_rows(make, stache_ids, project_id, 10, start=2)
+    statements.clear()
+    assert client.get(path).status_code == 200
+    assert len(statements) == few, statements
@@ -0,0 +1,88 @@
+# tests/test_reminders.py
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import scheduler
+from app import MAX_REMINDER_INTERVAL
+from models import db, Reminder, Notification, next_occurrence
+from scheduler import fire_due, refresh_digests, run
+
+
+def test_reminder_time_is_utc_end_to_end(app, client, make):
+    item_id = make.item(make.stache("Camping"), "Headlamp")
+    response = client.post(f"/items/{item_id}/reminders", data={
+        "title": "Replace batteries", "starts_at": "2030-01-02T09:30", "recurrence": "once",
+    })
+    assert response.status_code == 302
+
+    page = client.get(f"/items/{item_id}").get_data(as_text=True)
+    assert "First due (UTC)" in page
+    assert "Next 2030-01-02 09:30 UTC" in page
+
+    # The scheduler compares against utcnow(), so the entered time is the UTC time it fires
+    with app.app_context():
+        assert fire_due(datetime(2030, 1, 2, 9, 29)) == 0
+        assert fire_due(datetime(2030, 1, 2, 9, 30)) == 1
+        assert db.session.scalar(db.select(db.func.count(Notification.id))) == 1
+        assert db.session.scalar(db.select(Reminder.next_due_at)) is None
+
+
+@pytest.mark.sqlite_only
+def test_scheduler_batches_take_the_write_lock_up_front(app, client, make, statements):
+    item_id = make.item(make.stache("Camping"), "Headlamp")
+    client.post(f"/items/{item_id}/reminders", data={
+        "title": "Replace batteries", "starts_at": "2030-01-02T09:30", "recurrence": "once",
+    })
+
+    statements.clear()
+    with app.app_context():
+        assert fire_due(datetime(2030, 1, 2, 9, 30)) == 1
+        refresh_digests(datetime(2030, 1, 2).date())
+    # A deferred BEGIN would fail rather than wait if a web worker
+    # committed between the batch's SELECT and its first write
+    begins = [s for s in statements if s.startswith("BEGIN")]
+    assert begins and set(begins) == {"BEGIN IMMEDIATE"}
+
+
+def test_run_retries_a_pass_that_failed_on_the_database(app, monkeypatch):
+    stop = threading.Event()
+    passes = []
+
+    def fire_due(now, batch_size):
+        passes.append(now)
+        if len(passes) == 1:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        stop.set()
+        return 0
+
+    monkeypatch.setattr(scheduler, "fire_due", fire_due)
+    monkeypatch.setattr(scheduler, "RETRY_SECONDS", 0)
+    with app.app_context():
+        run(stop)
+    assert len(passes) == 2
+
+
+def test_reminder_interval_is_capped(client, make):
+    item_id = make.item(make.stache("Camping"), "Headlamp")
+
+    def add(interval):
+        return client.post(f"/items/{item_id}/reminders", data={
+            "title": "Service", "starts_at": "2030-01-02T09:30", "recurrence": "yearly",
+            "interval": interval,
+        }).status_code
+
+    assert add(MAX_REMINDER_INTERVAL + 1) == 400
+    assert add(MAX_REMINDER_INTERVAL) == 302
+    assert 'max="1000"' in client.get(f"/items/{item_id}").get_data(as_text=True)
+
+
+@pytest.mark.parametrize("recurrence, interval", [
+    ("daily", 10 ** 6), ("weekly", 10 ** 12), ("monthly", 10 ** 6), ("yearly", 1000),
+])
+def test_a_series_past_year_9999_ends(recurrence, interval):
+    starts_at = datetime(9000, 1, 1)
+    assert next_occurrence(starts_at, recurrence, interval, starts_at) is None
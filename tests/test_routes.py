@@ -0,0 +1,91 @@
+# tests/test_routes.py
+"""
+Routes with per-dialect code paths: slug allocation (a byte range on
+SQLite, a prefix LIKE elsewhere), batch inserts with RETURNING (sorted
+ids on SQLite, sort_by_parameter_order elsewhere), search (FTS5 or
+LIKE) and the set-based deletes. Run on both backends by conftest.
+"""
+
+
+def test_stache_slugs_count_up_past_taken_ones(client):
+    slugs = [
+        client.post("/api/staches", json={"name": name}).get_json()["stache"]["slug"]
+        for name in ("Camping", "Camping", "Camping Gear", "camping!", "Camping")
+    ]
+    assert slugs == ["camping", "camping-2", "camping-gear", "camping-3", "camping-4"]
+
+
+def test_stache_slug_reuses_the_base_once_it_is_free(client, make):
+    make.stache("Camping", slug="camping-2")
+    make.stache("Camping Gear")
+
+    response = client.post("/api/staches", json={"name": "Camping"})
+    assert response.get_json()["stache"]["slug"] == "camping"
+
+
+def test_item_batch_returns_ids_in_input_order(client, make):
+    stache_id = make.stache("Camping")
+    rows = [
+        {"stache_id": stache_id, "name": f"Item {n}", "notes": "noted" if n % 2 else None,
+         "tags": ["shelter"] if n % 3 else []}
+        for n in range(7)
+    ]
+    response = client.post("/api/items", json=rows)
+    assert response.status_code == 201
+
+    for row, result in zip(rows, response.get_json()["results"]):
+        item = client.get(f"/api/items/{result['id']}").get_json()["item"]
+        assert item["name"] == row["name"]
+        assert item["notes"] == (row["notes"] or "")
+
+
+def test_task_batch_links_items(client, make):
+    stache_id = make.stache("Camping")
+    item_id = make.item(stache_id, "Stove")
+    project_id = client.post(
+        "/api/projects", json={"name": "Trip", "stache_id": stache_id}
+    ).get_json()["project"]["id"]
+
+    response = client.post(f"/api/projects/{project_id}/tasks", json=[
+        {"description": "Clean it", "item_id": item_id},
+        {"description": "Buy fuel"},
+    ])
+    assert response.status_code == 201
+    tasks = client.get(f"/api/projects/{project_id}").get_json()["tasks"]
+    assert [(t["description"], t["item_id"]) for t in tasks] == [
+        ("Clean it", item_id), ("Buy fuel", None),
+    ]
+
+
+def test_search_finds_items_by_any_field(client, make):
+    stache_id = make.stache("Camping")
+    make.item(stache_id, "Titanium Stove")
+    make.item(stache_id, "Headlamp")
+
+    page = client.get("/search?q=titanium").get_data(as_text=True)
+    assert "Titanium Stove" in page
+    assert "Headlamp" not in page
+
+
+def test_deleting_a_stache_removes_its_items_and_projects(client, make):
+    stache_id = make.stache("Camping")
+    item_id = make.item(stache_id, "Stove", tags="cooking")
+    project_id = make.project(stache_id, "Trip")
+    make.task(project_id, "Clean the stove", item_id=item_id)
+    kept_id = make.item(make.stache("Garage"), "Ladder")
+
+    assert client.post("/staches/camping/delete").status_code == 302
+    assert client.get(f"/api/items/{item_id}").status_code == 404
+    assert client.get(f"/api/projects/{project_id}").status_code == 404
+    assert client.get(f"/api/items/{kept_id}").status_code == 200
+
+
+def test_export_streams_every_item(client, make):
+    stache_id = make.stache("Camping")
+    for n in range(5):
+        make.item(stache_id, f"Item {n}")
+
+    lines = client.get("/export/items.csv").get_data(as_text=True).splitlines()
+    assert len(lines) == 6
+    for n in range(5):
+        assert any(f"Item {n}" in line for line in lines[1:])
@@ -0,0 +1,39 @@
+# tests/test_search.py
+import pytest
+import sqlalchemy as sa
+
+from models import db
+
+
+def test_renamed_item_is_found_by_its_new_name_only(client, make):
+    stache_id = make.stache("Camping")
+    item_id = make.item(stache_id, "Titanium Stove")
+
+    response = client.post(
+        f"/items/{item_id}/edit", data={"name": "Alcohol Burner", "stache_id": stache_id}
+    )
+    assert response.status_code == 302
+    assert "Alcohol Burner" in client.get("/search?q=alcohol").get_data(as_text=True)
+    assert "Alcohol Burner" not in client.get("/search?q=titanium").get_data(as_text=True)
+
+
+@pytest.mark.sqlite_only
+def test_timestamp_only_update_leaves_search_index_alone(app, make):
+    item_id = make.item(make.stache("Camping"), "Titanium Stove")
+    with app.app_context():
+        connection = db.session.connection()
+        # total_changes() also counts rows written by triggers
+        before = connection.execute(sa.text("SELECT total_changes()")).scalar()
+        connection.execute(
+            sa.text("UPDATE items SET updated_at = CURRENT_TIMESTAMP WHERE id = :id"),
+            {"id": item_id},
+        )
+        after = connection.execute(sa.text("SELECT total_changes()")).scalar()
+        assert after - before == 1
+
+        connection.execute(
+            sa.text("UPDATE items SET notes = 'titanium, 85 g' WHERE id = :id"),
+            {"id": item_id},
+        )
+        assert connection.execute(sa.text("SELECT total_changes()")).scalar() - after > 1
+        db.session.commit()
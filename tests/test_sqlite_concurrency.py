@@ -0,0 +1,75 @@
+# tests/test_sqlite_concurrency.py
+"""
+Several gunicorn workers write to one SQLite file. With WAL and
+BEGIN IMMEDIATE a write request waits for the lock (busy_timeout)
+instead of failing with "database is locked" when another one commits
+between its first read and its first write.
+
+Each writer is a separate process that imports the app afresh, so it
+has its own engine, connection pool and SQLite connections on the same
+file, as a gunicorn worker does. Threads sharing one engine would also
+share Python's GIL and the sqlite3 module's locks, which is not what
+runs in production.
+"""
+import multiprocessing
+import os
+
+import pytest
+from sqlalchemy import select
+
+from models import db, Item
+
+WORKERS = 4
+WRITES_PER_WORKER = 25
+
+
+def worker(database_url, user_id, stache_id, number, start, results):
+    """Post WRITES_PER_WORKER items from a fresh copy of the app; report the outcome."""
+    os.environ["STACHE_DATABASE_URL"] = database_url
+    from app import app
+
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+        session["username"] = "tester"
+        session["sid"] = f"test-{user_id}"
+
+    statuses, errors = [], []
+    start.wait()
+    for n in range(WRITES_PER_WORKER):
+        try:
+            # Reads the user's staches, then inserts: the read-then-write
+            # pattern a deferred transaction can't upgrade under contention
+            response = client.post("/items/new", data={
+                "name": f"Item {number}-{n}", "stache_id": stache_id, "tags": "shared",
+            })
+            statuses.append(response.status_code)
+        except Exception as error:  # surfaced below with the message
+            errors.append(repr(error))
+    results.put((statuses, errors))
+
+
+@pytest.mark.sqlite_only
+def test_concurrent_writers_never_see_a_locked_database(app, make, database_url):
+    stache_id = make.stache("Camping")
+    # spawn, not fork: nothing (pooled connections included) is inherited
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(WORKERS)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(database_url, make.user, stache_id, n, start, results))
+        for n in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+
+    errors = [error for _, worker_errors in outcomes for error in worker_errors]
+    assert not errors, errors[:3]
+    assert [status for statuses, _ in outcomes for status in statuses] == [302] * (WORKERS * WRITES_PER_WORKER)
+    with app.app_context():
+        assert db.session.execute(select(db.func.count(Item.id))).scalar() == WORKERS * WRITES_PER_WORKER
+        assert db.session.connection().exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
@@ -0,0 +1,43 @@
+# tests/test_tags.py
+import pytest
+
+from models import db
+
+
+def query_plan(app, statement, parameters):
+    with app.app_context():
+        rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "\n".join(row[-1] for row in rows)
+
+
+def test_tag_filter_matches_every_selected_tag(client, make):
+    stache_id = make.stache("Camping")
+    make.item(stache_id, "Tent", tags="shelter, summer")
+    make.item(stache_id, "Tarp", tags="shelter")
+    make.item(stache_id, "Stove", tags="summer")
+
+    page = client.get("/tags?tag=Shelter&tag=summer").get_data(as_text=True)
+    assert "Tent" in page
+    assert "Tarp" not in page and "Stove" not in page
+
+
+@pytest.mark.sqlite_only
+def test_tag_filter_reads_the_inverted_index(app, client, make, statements):
+    stache_id = make.stache("Camping")
+    for n in range(20):
+        make.item(stache_id, f"Item {n}", tags="shelter" if n % 2 else "cooking")
+
+    statements.clear()
+    assert client.get("/tags?tag=shelter").status_code == 200
+
+    filtered = [
+        (statement, parameters)
+        for statement, parameters in zip(statements, statements.parameters)
+        if "tags.name = " in statement
+    ]
+    assert filtered
+    for statement, parameters in filtered:
+        plan = query_plan(app, statement, parameters)
+        # Tag first, then its items, never a per-item EXISTS
+        assert "ix_item_tags_tag_id_item_id (tag_id=?)" in plan, plan
+        assert "CORRELATED" not in plan, plan
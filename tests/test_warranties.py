@@ -0,0 +1,42 @@
+# tests/test_warranties.py
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Warranty, utc_today
+from scheduler import refresh_digests
+
+
+@pytest.fixture
+def server_date_is_not_utc(monkeypatch):
+    """Put the server in a time zone whose date differs from UTC's right now."""
+    if not hasattr(time, "tzset"):
+        pytest.skip("needs time.tzset")
+    # Etc/GMT-14 is UTC+14 (a day ahead from 10:00 UTC on), Etc/GMT+12 is UTC-12
+    zone = "Etc/GMT-14" if datetime.utcnow().hour >= 10 else "Etc/GMT+12"
+    monkeypatch.setenv("TZ", zone)
+    time.tzset()
+    assert datetime.now().date() != utc_today()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_pages_use_the_scheduler_digest_whatever_the_server_zone(
+    app, client, make, statements, server_date_is_not_utc
+):
+    item_id = make.item(make.stache("Camping"), "Drill")
+    with app.app_context():
+        db.session.add(Warranty(
+            user_id=make.user, item_id=item_id, provider="Maker",
+            expires_on=utc_today() + timedelta(days=3),
+        ))
+        db.session.commit()
+        refresh_digests(utc_today())
+
+    statements.clear()
+    page = client.get("/").get_data(as_text=True)
+    assert "Drill" in page
+    # Read, not recomputed and rewritten during a GET
+    assert not [s for s in statements if "warranty_digests" in s and not s.lstrip().startswith("SELECT")]